@@ -13,5 +13,11 @@ setup(
     download_url='https://github.com/fastforwardlabs/steganos/tarball/master',
     license="GNU Lesser General Public License v3 or later (LGPLv3+)",
 
-    packages=['steganos'],
+    packages=['steganos', 'steganos.src', 'steganos.benchmarks'],
+    entry_points={
+        'console_scripts': [
+            'steganos-benchmark = steganos.src.benchmark:main',
+        ],
+    },
+    extras_require={'numpy': ['numpy']},
 )
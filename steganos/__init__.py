@@ -1,9 +1,27 @@
 from .src.steganos_encode import bit_capacity
-from .src.steganos_encode import encode
+from .src.steganos_encode import encode, encode_many
 from .src.steganos_decode import decode_full_text
 from .src.steganos_decode import decode_partial_text
 from .src.steganos_decode import binary_to_bytes, bytes_to_binary
+from .src.bits import Bits
+from .src.plan import Plan, prepare
+from .src.compact import CompactBranchpoints
+from .src.stream import encode_stream, decode_stream
+from .src.store import save_plan, load_plan
+from .src.window import WindowIndex, save_window_index, load_window_index
+from .src.corpus import CorpusIndex, save_corpus, load_corpus
+from .src.payloads import PayloadRegistry, save_registry, load_registry
+from .src.cache import enable_cache, disable_cache, cache_info
+from .src.branchpoints import capacity_gain, Analyzer, register_rule
+from .src.instrumentation import instrument
 
 __version__ = '0.0.1'
 
-__all__ = ['bit_capacity', 'encode', 'decode_full_text', 'decode_partial_text']
+__all__ = ['bit_capacity', 'encode', 'encode_many', 'encode_stream',
+           'decode_full_text', 'decode_partial_text', 'decode_stream',
+           'prepare', 'Plan', 'CompactBranchpoints', 'enable_cache',
+           'disable_cache', 'cache_info', 'capacity_gain', 'instrument',
+           'Analyzer', 'register_rule', 'save_plan', 'load_plan',
+           'CorpusIndex', 'save_corpus', 'load_corpus', 'PayloadRegistry',
+           'save_registry', 'load_registry', 'Bits', 'WindowIndex',
+           'save_window_index', 'load_window_index']
@@ -0,0 +1,11 @@
+"""
+Scripts that time one optimization each against the code it replaced, on
+the sample text of the tests.  steganos.src.benchmark times every operation
+on documents of different sizes and shapes.
+
+Run from the root of the repository:
+
+    $ python -m steganos.benchmarks.contractions
+    $ python -m steganos.benchmarks.decode_lookup
+    $ python -m steganos.benchmarks.flatten
+"""
@@ -0,0 +1,65 @@
+"""
+Checks that finding contractions stays flat as the table of contractions
+grows.
+
+For tables of growing size (the built-in contractions followed by made up
+pairs), times matching every contraction and long form with its own
+re.finditer pass, the way contractions used to be found, and with the
+Trie of an Analyzer's contraction rule.
+
+Run from the root of the repository:
+
+    $ python -m steganos.benchmarks.contractions --sizes 7 100 1000
+"""
+import argparse
+import re
+
+from ..src.benchmark import sample_text, timed
+from ..src.branchpoints import CONTRACTIONS, Analyzer
+
+
+def made_up_contractions(count):
+    """ pairs like ("abcn't", 'abc not'), after the built-in ones """
+    pairs = list(CONTRACTIONS)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    for index in range(count - len(pairs)):
+        stem = ''.join(letters[(index // 26 ** power) % 26]
+                       for power in range(3))
+        pairs.append((stem + "n't", stem + ' not'))
+    return pairs
+
+
+def finditer_branchpoints(contractions, text):
+    branchpoints = []
+    for contraction, long_form in contractions:
+        for match in re.finditer(re.escape(contraction), text):
+            branchpoints.append([(match.start(), match.end(), long_form)])
+        for match in re.finditer(re.escape(long_form), text):
+            branchpoints.append([(match.start(), match.end(), contraction)])
+    return branchpoints
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[7, 100, 1000])
+    parser.add_argument('--bytes', type=int, default=300000)
+    args = parser.parse_args()
+
+    text = sample_text(args.bytes)
+    print('{:>10} {:>14} {:>10} {:>10}'.format(
+        'pairs', 'finditer (s)', 'trie (s)', 'scan (s)'))
+    for size in args.sizes:
+        contractions = made_up_contractions(size)
+        analyzer = Analyzer(rules=['contraction'], contractions=contractions)
+        expected, finditer_seconds = timed(finditer_branchpoints,
+                                           contractions, text)
+        found, trie_seconds = timed(analyzer.contraction_trie.find, text)
+        assert found == expected
+        _, scan_seconds = timed(analyzer.scan, text)
+        print('{:>10} {:>14.4f} {:>10.4f} {:>10.4f}'.format(
+            size, finditer_seconds, trie_seconds, scan_seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Compares the cost of finding the branchpoint that each change belongs to
+during decoding, before and after the precomputed change index.
+
+Before, decode_partial_text scanned the list of branchpoints for every
+change, which is quadratic in the number of changes.  That scan is far too
+slow to run in full on large texts, so it is timed on a sample of changes
+and projected to all of them.  After, decoding builds a ChangeIndex once and
+takes the changes of the decoded piece, each with its branchpoint, from
+get_relevant_changes; building the index, get_relevant_changes over the
+whole text and decode_full_text with the index are timed.
+
+Run from the root of the repository:
+
+    $ python -m steganos.benchmarks.decode_lookup --max-bytes 1200000
+"""
+import argparse
+import random
+
+from ..src.benchmark import sample_text, timed
+from ..src.branchpoints import ChangeIndex, get_all_branchpoints
+from ..src.steganos_decode import decode_full_text, get_relevant_changes
+from ..src.steganos_encode import encode
+
+
+def scan_lookup(branchpoints, change):
+    return branchpoints.index(next(bp for bp in branchpoints
+                                   if change in bp))
+
+
+def benchmark(size, samples):
+    text = sample_text(size)
+    branchpoints = get_all_branchpoints(text)
+    change_index, index_seconds = timed(ChangeIndex, branchpoints)
+    capacity = change_index.capacity
+    bits = ''.join(random.Random(1).choice('01') for _ in range(capacity))
+    encoded_text = encode(bits, text, change_index=change_index)
+
+    relevant, relevant_seconds = timed(get_relevant_changes, change_index, 0,
+                                       len(text))
+    changes = [change for change, _ in relevant]
+    sampled = random.Random(0).sample(changes, min(samples, len(changes)))
+    _, sample_seconds = timed(lambda: [scan_lookup(branchpoints, change)
+                                       for change in sampled])
+    scan_seconds = sample_seconds / max(len(sampled), 1) * len(changes)
+
+    decoded, decode_seconds = timed(decode_full_text, encoded_text, text,
+                                    capacity, change_index=change_index)
+    assert decoded == bits
+
+    return {'bytes': size, 'branchpoints': capacity,
+            'changes': len(changes), 'scan_seconds': scan_seconds,
+            'index_seconds': index_seconds,
+            'relevant_seconds': relevant_seconds,
+            'decode_seconds': decode_seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--max-bytes', type=int, default=1200000)
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    print('{:>10} {:>12} {:>10} {:>16} {:>10} {:>13} {:>11}'.format(
+        'bytes', 'branchpoints', 'changes', 'before (proj. s)', 'index (s)',
+        'relevant (s)', 'decode (s)'))
+    size = 75000
+    while size <= args.max_bytes:
+        result = benchmark(size, args.samples)
+        print('{bytes:>10} {branchpoints:>12} {changes:>10} '
+              '{scan_seconds:>16.2f} {index_seconds:>10.4f} '
+              '{relevant_seconds:>13.4f} {decode_seconds:>11.4f}'
+              .format(**result))
+        size *= 2
+
+
+if __name__ == '__main__':
+    main()
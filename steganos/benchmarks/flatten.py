@@ -0,0 +1,78 @@
+"""
+Checks that flattening branchpoints into their sorted changes stays linear.
+
+For texts of doubling size, times sum(branchpoints, []) (the way changes
+used to be flattened), building a ChangeIndex, and encoding with it.  The
+time per change should stay roughly flat as texts grow; with --check the
+script fails if building the index or encoding becomes more than
+--tolerance times slower per change on the largest text than on the
+smallest.
+
+Run from the root of the repository:
+
+    $ python -m steganos.benchmarks.flatten --max-bytes 1200000 --check
+"""
+import argparse
+import sys
+
+from ..src.benchmark import sample_text, timed
+from ..src.branchpoints import ChangeIndex, get_all_branchpoints
+from ..src.steganos_encode import encode
+
+
+def benchmark(size, with_sum):
+    text = sample_text(size)
+    branchpoints = get_all_branchpoints(text)
+
+    sum_seconds = None
+    if with_sum:
+        _, sum_seconds = timed(sum, branchpoints, [])
+    change_index, index_seconds = timed(ChangeIndex, branchpoints)
+    bits = '10' * (len(branchpoints) // 2)
+    _, encode_seconds = timed(encode, bits, text, branchpoints,
+                              change_index)
+
+    return {'bytes': size, 'changes': len(change_index),
+            'sum_seconds': sum_seconds, 'index_seconds': index_seconds,
+            'encode_seconds': encode_seconds}
+
+
+def per_change(result, key):
+    return result[key] / max(result['changes'], 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--max-bytes', type=int, default=1200000)
+    parser.add_argument('--sum-max-bytes', type=int, default=150000,
+                        help='largest text to time sum() on, as it is '
+                             'quadratic')
+    parser.add_argument('--check', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=3.0)
+    args = parser.parse_args()
+
+    print('{:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+        'bytes', 'changes', 'sum (s)', 'index (s)', 'encode (s)'))
+    results = []
+    size = 75000
+    while size <= args.max_bytes:
+        result = benchmark(size, size <= args.sum_max_bytes)
+        results.append(result)
+        sum_seconds = ('{:>10.4f}'.format(result['sum_seconds'])
+                       if result['sum_seconds'] is not None else
+                       '{:>10}'.format('-'))
+        print('{bytes:>10} {changes:>10} {sum} {index_seconds:>10.4f} '
+              '{encode_seconds:>10.4f}'.format(sum=sum_seconds, **result))
+        size *= 2
+
+    if args.check and len(results) > 1:
+        for key in ('index_seconds', 'encode_seconds'):
+            ratio = (per_change(results[-1], key) /
+                     per_change(results[0], key))
+            if ratio > args.tolerance:
+                print('{} per change grew {:.1f} times'.format(key, ratio))
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
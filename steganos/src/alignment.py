@@ -0,0 +1,107 @@
+"""
+Finds where a piece of encoded text might have come from in the original.
+
+Encoding only ever changes the text at its branchpoints, so a piece of
+encoded text still contains long stretches copied verbatim from the original
+once the characters that encoding inserts are stripped out.  An
+AlignmentIndex samples short substrings ('grams') of the original text at
+regular intervals.  Looking up every gram of the stripped encoded text finds
+the places where such a stretch lines up with the original, which gives a
+handful of candidate start indices to verify instead of every index of the
+original text.
+"""
+import zlib
+from array import array
+from bisect import bisect_left
+
+# characters that encoding inserts without replacing anything
+INSERTED_CHARACTERS = '\u200b\u2060\u200e\u200f'
+STRIP_TABLE = {ord(char): None for char in INSERTED_CHARACTERS}
+
+
+class AlignmentIndex:
+    def __init__(self, text, gram=8, step=8):
+        self.text = text
+        self.gram = gram
+        self.step = step
+
+        grams = [(gram_key(text[position:position + gram]), position)
+                 for position in range(0, len(text) - gram + 1, step)]
+        grams.sort()
+        self.keys = array('I', (key for key, _ in grams))
+        self.positions = array('q', (position for _, position in grams))
+
+    @classmethod
+    def from_arrays(cls, text, keys, positions, gram=8, step=8):
+        """ wraps sorted keys and positions, as stored by the store module """
+        index = cls('', gram, step)
+        index.text = text
+        index.keys = keys
+        index.positions = positions
+        return index
+
+    def lookup(self, piece):
+        """ yields the sampled indices at which piece occurs in the text """
+        key = gram_key(piece)
+        index = bisect_left(self.keys, key)
+        while index < len(self.keys) and self.keys[index] == key:
+            position = self.positions[index]
+            if self.text.startswith(piece, position):
+                yield position
+            index += 1
+
+
+def gram_key(piece):
+    return zlib.crc32(piece.encode('utf8', 'surrogatepass'))
+
+
+def strip_inserted_characters(text):
+    return text.translate(STRIP_TABLE)
+
+
+def candidate_starts(encoded_text, index, changes, change_starts):
+    """
+    Returns the indices of the original text at which the encoded text might
+    start, in ascending order.
+
+    A gram found at index 'position' of the original and at index 'offset'
+    of the stripped encoded text suggests that the encoded text starts at
+    position - offset.  Changes made before the gram may have made the
+    encoded text longer or shorter than the original, so the candidates
+    around that index are widened by the most that the nearby changes could
+    have shifted it.
+
+    :param changes: sorted list of all the changes of the original text.
+    :param change_starts: the start index of each of those changes.
+    """
+    stripped = strip_inserted_characters(encoded_text)
+    candidates = set()
+    first_hit = None
+    for offset in range(len(stripped) - index.gram + 1):
+        # every verbatim stretch that covers a sampled gram is found within
+        # 'step' consecutive offsets of the first hit
+        if first_hit is not None and offset >= first_hit + index.step:
+            break
+        for position in index.lookup(stripped[offset:offset + index.gram]):
+            if first_hit is None:
+                first_hit = offset
+            shift = max_shift(changes, change_starts,
+                              position - 2 * offset - index.gram, position)
+            candidates.update(range(position - offset - shift,
+                                    position - offset + shift + 1))
+    return sorted(start for start in candidates
+                  if 0 <= start < len(index.text))
+
+
+def max_shift(changes, change_starts, start, end):
+    """
+    The most that making changes starting between start and end can change
+    the length of the text, not counting inserted characters.
+    """
+    shift = 0
+    for index in range(bisect_left(change_starts, start),
+                       bisect_left(change_starts, end)):
+        change_start, change_end, change_string = changes[index]
+        shift += abs(len(strip_inserted_characters(change_string)) -
+                     (change_end - change_start))
+    return shift
@@ -0,0 +1,223 @@
+"""
+Measures how long encoding, decoding and finding branchpoints take on
+documents of different sizes and shapes, and prints the results as JSON so
+that runs of different releases can be compared.
+
+Three kinds of synthetic documents are generated: prose, markdown with many
+links, URLs and code fences, and text full of digits.  Real documents can be
+added with --corpus.  Every operation is run on every document at every
+size:
+
+    $ steganos-benchmark --sizes 1000 100000 10000000 --output results.json
+
+The decode operations are skipped on documents larger than
+--max-decode-bytes.
+"""
+import argparse
+import gzip
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import steganos
+from . import branchpoints
+from . import steganos_decode
+from . import steganos_encode
+
+SIZES = [1000, 10000, 100000, 1000000]
+MAX_DECODE_BYTES = 10000000
+# length of the piece of encoded text decoded by the partial decode
+# operations
+PIECE_LENGTH = 2000
+# the text that the scripts in steganos.benchmarks time
+SAMPLE_TEXT = os.path.join(os.path.dirname(__file__), '..', 'test',
+                           'sample_text.txt.gz')
+
+WORDS = ['the', 'of', 'and', 'a', 'to', 'in', 'is', 'you', 'that', 'it',
+         'he', 'was', 'for', 'on', 'are', 'as', 'with', 'his', 'they', 'at',
+         "won't", "can't", "isn't", 'does not', 'would have', 'how will',
+         'hadn\'t', 'London', 'Mary', 'said', 'slowly', 'text', 'message']
+
+RULES = {
+    'tab': branchpoints.get_tab_branchpoints,
+    'contraction': branchpoints.get_contraction_branchpoints,
+    'single_quotes': branchpoints.get_single_quotes_branchpoint,
+    'single_digit': branchpoints.get_single_digit_branchpoint,
+    'directional_mark': branchpoints.get_directional_mark_branchpoints,
+    'non_breaking': branchpoints.get_non_breaking_branchpoints,
+    'zero_width_space': branchpoints.get_zero_width_space_branchpoints,
+    'unchangeable_areas': branchpoints.find_unchangeable_areas,
+}
+
+
+def prose(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(4, 20))]
+    sentence = ' '.join(words).capitalize() + rng.choice('..?!')
+    if rng.random() < 0.2:
+        sentence = '"{}"'.format(sentence)
+    if rng.random() < 0.1:
+        sentence = '\t' + sentence
+    return sentence + rng.choice(['  ', ' ', '\n', '\n\n'])
+
+
+def markdown(rng):
+    kind = rng.random()
+    if kind < 0.1:
+        return '\n## {}\n\n'.format(prose(rng).strip())
+    if kind < 0.3:
+        return 'See [{}](https://example.com/{}) for more. '.format(
+            rng.choice(WORDS), rng.randint(0, 10**6))
+    if kind < 0.4:
+        return 'Visit http://example.org/{}?q={} now. '.format(
+            rng.choice(WORDS), rng.randint(0, 99))
+    if kind < 0.5:
+        return '\n```py\nx = "{}"\ny = {}\n```\n'.format(
+            rng.choice(WORDS), rng.randint(0, 9))
+    return prose(rng)
+
+
+def digits(rng):
+    numbers = ' '.join(str(rng.choice([rng.randint(1, 9),
+                                       rng.randint(10, 10**6),
+                                       rng.random()]))
+                       for _ in range(rng.randint(2, 8)))
+    return '{} were {}. '.format(rng.choice(WORDS).capitalize(), numbers)
+
+
+SHAPES = {'prose': prose, 'markdown': markdown, 'digits': digits}
+
+
+def synthetic_text(shape, size, seed=0):
+    """ a document of the given shape, exactly size characters long """
+    rng = random.Random(seed)
+    pieces = []
+    length = 0
+    while length < size:
+        piece = SHAPES[shape](rng)
+        pieces.append(piece)
+        length += len(piece)
+    return ''.join(pieces)[:size]
+
+
+def read_corpus(path, size):
+    with open(path, encoding='utf8') as corpus:
+        text = corpus.read()
+    if not text:
+        return text
+    return (text * (size // len(text) + 1))[:size]
+
+
+def sample_text(size):
+    """ the sample text of the tests, repeated or cut to size """
+    with gzip.open(SAMPLE_TEXT) as sample:
+        text = sample.read().decode('utf8')
+    return (text * (size // len(text) + 1))[:size]
+
+
+def timed(function, *args, **kwargs):
+    begin = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - begin
+
+
+def run_document(name, text, max_decode_bytes):
+    """ yields a result for every operation on one document """
+    def result(operation, seconds, **extra):
+        return dict(document=name, bytes=len(text), operation=operation,
+                    seconds=seconds, **extra)
+
+    for rule, function in RULES.items():
+        found, seconds = timed(function, text)
+        yield result('rule:' + rule, seconds, found=len(found))
+
+    found, seconds = timed(branchpoints.find_all_branchpoints, text)
+    yield result('get_all_branchpoints', seconds, branchpoints=len(found))
+
+    capacity, seconds = timed(steganos_encode.bit_capacity, text)
+    yield result('bit_capacity', seconds, capacity=capacity)
+    if not capacity:
+        return
+
+    bits = ''.join(random.Random(1).choice('01') for _ in range(capacity))
+    encoded_text, seconds = timed(steganos_encode.encode, bits, text)
+    yield result('encode', seconds)
+
+    if len(text) > max_decode_bytes:
+        return
+
+    _, seconds = timed(steganos_decode.decode_full_text, encoded_text, text,
+                       capacity)
+    yield result('decode_full_text', seconds)
+
+    # a piece from the middle of the encoded text, which may start or end
+    # in the middle of a change
+    start = max((len(encoded_text) - PIECE_LENGTH) // 2, 0)
+    piece = encoded_text[start:start + PIECE_LENGTH]
+    try:
+        _, seconds = timed(steganos_decode.decode_partial_text, piece, text,
+                           message_bits=capacity)
+    except ValueError as error:
+        yield result('decode_partial_text', None, error=str(error))
+    else:
+        yield result('decode_partial_text', seconds)
+
+    try:
+        encoded_range = steganos_decode.get_indices(piece, text, found)
+        _, seconds = timed(steganos_decode.decode_partial_text, piece, text,
+                           encoded_range, capacity)
+    except ValueError as error:
+        yield result('decode_partial_text:encoded_range', None,
+                     error=str(error))
+    else:
+        yield result('decode_partial_text:encoded_range', seconds)
+
+
+def run(sizes, shapes, corpora, max_decode_bytes):
+    results = []
+    for size in sizes:
+        documents = [('{}-{}'.format(shape, size),
+                      synthetic_text(shape, size))
+                     for shape in shapes]
+        documents.extend(('{}-{}'.format(path, size), read_corpus(path, size))
+                         for path in corpora)
+        for name, text in documents:
+            results.extend(run_document(name, text, max_decode_bytes))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='document sizes in characters')
+    parser.add_argument('--shapes', nargs='+', default=list(SHAPES),
+                        choices=list(SHAPES),
+                        help='kinds of synthetic documents')
+    parser.add_argument('--corpus', action='append', default=[],
+                        help='a text file to benchmark, repeated or cut to '
+                             'every size')
+    parser.add_argument('--max-decode-bytes', type=int,
+                        default=MAX_DECODE_BYTES)
+    parser.add_argument('--output', help='file to write the JSON to, '
+                                         'instead of standard output')
+    args = parser.parse_args(argv)
+
+    report = {
+        'steganos': steganos.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': run(args.sizes, args.shapes, args.corpus,
+                       args.max_decode_bytes),
+    }
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Packed messages.
+
+Messages can be given to the encode functions as strings of '0' and '1', as
+bytes (eight bits per byte, most significant bit first, as bytes_to_binary
+orders them) or as Bits, which packs bits eight to a byte and can mark some
+of them as unknown.  The decode functions return Bits when called with
+packed=True, in which the bits that could not be recovered are unknown.
+
+Converting between the three forms is done a whole message at a time with
+int and bytes methods rather than a character at a time, and the encode
+functions read the bits of bytes and Bits from the packed bytes.
+
+>> message = Bits(b'Hi')
+>> str(message)
+'0100100001101001'
+>> decoded = plan.decode_full_text(encoded_text, 16, packed=True)
+>> decoded.tobytes()
+b'Hi'
+"""
+# maps ASCII '1' to 1 and every other byte to 0
+FLAG_TABLE = bytes(1 if byte == ord('1') else 0 for byte in range(256))
+# maps the ASCII digits of a bit string to '1' if the bit is known
+KNOWN_TABLE = str.maketrans('01?', '110')
+BINARY_DIGITS = str.maketrans('', '', '01')
+
+
+class Bits:
+    """
+    :param data: The bits, packed eight to a byte, most significant first.
+    :param length (Optional): The number of bits, if the last byte is not
+                              used entirely.
+    :param known (Optional): Packed like data, with the bits that are known
+                             set.  All bits are known if it isn't given.
+    """
+    def __init__(self, data=b'', length=None, known=None):
+        self.data = bytes(data)
+        self.length = 8 * len(self.data) if length is None else length
+        if not 0 <= self.length <= 8 * len(self.data):
+            raise ValueError('{} bytes cannot hold {} bits.'.format(
+                len(self.data), self.length))
+        self.known = None if known is None else bytes(known)
+
+    @classmethod
+    def from_string(cls, string):
+        """ packs a string of '0', '1' and '?' (unknown) characters """
+        return cls(pack(string.replace('?', '0')), len(string),
+                   pack(string.translate(KNOWN_TABLE))
+                   if '?' in string else None)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Bits.from_string(str(self)[index])
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('bit index out of range')
+        byte, offset = divmod(index, 8)
+        if self.known is not None and not self.known[byte] >> 7 - offset & 1:
+            return '?'
+        return '1' if self.data[byte] >> 7 - offset & 1 else '0'
+
+    def __iter__(self):
+        return iter(str(self))
+
+    def __str__(self):
+        bits = unpack(self.data, self.length)
+        if self.known is None:
+            return bits
+        known = unpack(self.known, self.length)
+        return ''.join(bit if flag == '1' else '?'
+                       for bit, flag in zip(bits, known))
+
+    def __repr__(self):
+        return 'Bits({!r})'.format(str(self))
+
+    def __eq__(self, other):
+        if isinstance(other, (Bits, str)):
+            return str(self) == str(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def tobytes(self):
+        """
+        The bytes of the message.  A byte with unknown bits is b'?', and
+        the bits after the last whole byte make up a last byte of their own.
+        """
+        if self.known is None and self.length % 8 == 0:
+            return self.data
+        return string_to_bytes(str(self))
+
+    def flags(self):
+        """ 1 for every bit that is known to be set and 0 for the others """
+        data = self.data
+        if self.known is not None:
+            data = bytes(byte & known
+                         for byte, known in zip(data, self.known))
+        return PackedFlags(data, self.length)
+
+
+class PackedFlags:
+    """
+    The flags of a packed message, read from its bytes one bit at a time
+    rather than expanded to a byte per bit.  Only indices from 0 to its
+    length are valid.
+    """
+    def __init__(self, data, length):
+        self.data = data
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        return self.data[index >> 3] >> (7 - (index & 7)) & 1
+
+    def __iter__(self):
+        return (self[index] for index in range(self.length))
+
+
+def bit_flags(message):
+    """
+    Returns the bits of a message as flags, 1 if the bit is set and 0 if
+    not, so that the encode functions can index the bits of any form of
+    message (repeated, by taking the index modulo its length) without
+    converting them one at a time.  Packed messages stay packed.
+
+    :param message: A string or any other sequence of '0' and '1'
+                    characters, bytes or Bits.
+    """
+    if isinstance(message, Bits):
+        return message.flags()
+    if isinstance(message, (bytes, bytearray, memoryview)):
+        data = bytes(message)
+        return PackedFlags(data, 8 * len(data))
+    # characters other than '1' count as unset, as they always have
+    if isinstance(message, str):
+        return message.encode('ascii', 'replace').translate(FLAG_TABLE)
+    return bytes(1 if bit == '1' else 0 for bit in message)
+
+
+def string_to_bytes(binary):
+    """
+    Converts a string of bits to bytes as described in Bits.tobytes.  Any
+    run of eight characters that is not made of '0' and '1' becomes b'?'.
+    """
+    if len(binary) % 8 == 0 and not binary.translate(BINARY_DIGITS):
+        return pack(binary)
+    return bytes(byte_of(binary[index:index + 8])
+                 for index in range(0, len(binary), 8))
+
+
+def byte_of(chunk):
+    try:
+        return int(chunk, base=2)
+    except ValueError:
+        return ord('?')
+
+
+def bytes_to_string(message):
+    """ the bits of an iterable of bytes, most significant bit first """
+    data = bytes(message)
+    return unpack(data, 8 * len(data))
+
+
+def pack(string):
+    """ packs a string of '0' and '1' into bytes, padded with zeros """
+    if not string:
+        return b''
+    length = -(-len(string) // 8)
+    return (int(string, 2) << 8 * length - len(string)).to_bytes(length,
+                                                                 'big')
+
+
+def unpack(data, length):
+    """ the first length bits of data as a string of '0' and '1' """
+    if not data:
+        return ''
+    return format(int.from_bytes(data, 'big'),
+                  '0{}b'.format(8 * len(data)))[:length]
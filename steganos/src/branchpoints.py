@@ -1,39 +1,166 @@
+import hashlib
 import re
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, combinations
+
+from . import cache
+from . import instrumentation
+from . import vectorized
+from .compact import CompactBranchpoints, sort_order
+from .trie import Trie
+
+# identifies the default rules, so that cached analyses are never shared
+# between different rule sets
+RULESET = 'default'
+
+# ways of choosing branchpoints that do not intersect, see
+# mutually_exclusive_branchpoints
+GREEDY = 'greedy'
+OPTIMAL = 'optimal'
+STRATEGIES = (GREEDY, OPTIMAL)
+# the most steps (branchpoints considered, summed over the combinations of
+# global branchpoints tried) that the optimal strategy may take on a text.
+# It only depends on the text, so a text is always given the same
+# branchpoints, however fast the machine analyzing it.
+OPTIMAL_MAX_STEPS = 10**7
+
+
+def get_all_branchpoints(text, strategy=GREEDY, processes=None):
+    """
+    Returns the branchpoints of a text, found with the default rules.  If
+    caching has been enabled with cache.enable_cache, the result is looked
+    up in (and added to) the cache.  See Analyzer for other sets of rules.
+
+    :param strategy: How to choose among intersecting branchpoints, see
+                     mutually_exclusive_branchpoints.  A text must be
+                     decoded with the strategy it was encoded with.
+    :param processes (Optional): If given, segments of the text are analyzed
+                     by a pool of this many processes.  The branchpoints are
+                     the same either way.
+    """
+    return DEFAULT_ANALYZER.get_all_branchpoints(text, strategy, processes)
+
+
+def find_all_branchpoints(text, strategy=GREEDY):
+    return DEFAULT_ANALYZER.find_all_branchpoints(text, strategy)
+
 
+def find_candidate_branchpoints(text, stages=None):
+    return DEFAULT_ANALYZER.find_candidate_branchpoints(text, stages)
 
-def get_all_branchpoints(text):
-    # local and unicode branchpoints are sorted to maximize the information
-    # that can be retrieved from any contiguous piece of encoded text
-    sorted_branchpoints = sort_branchpoints(ascii_branchpoints(text) +
-                                            unicode_branchpoints(text))
-    branchpoints = global_branchpoints(text) + sorted_branchpoints
 
-    unchangeable_areas = find_unchangeable_areas(text)
-    changeable_branchpoints = [changeable_part(bp, unchangeable_areas)
-                               for bp in branchpoints]
-    filtered_branchpoints = [bp for bp in changeable_branchpoints if bp]
+def scan_branchpoints(text):
+    return DEFAULT_ANALYZER.scan(text)
+
+
+def capacity_gain(text, strategy=OPTIMAL, analyzer=None):
+    """
+    Returns the number of bits that a text can hold with the given strategy
+    beyond those it holds with the greedy one.
+    """
+    candidates = (analyzer or DEFAULT_ANALYZER).find_candidate_branchpoints(
+        text)
+    return (len(mutually_exclusive_branchpoints(candidates, strategy)) -
+            len(mutually_exclusive_branchpoints(candidates, GREEDY)))
+
 
-    nored_branchpoints = remove_redundant_characters(text,
-                                                     filtered_branchpoints)
-    return mutually_exclusive_branchpoints(nored_branchpoints)
+class ChangeIndex:
+    """
+    The changes of a list of branchpoints, flattened and sorted once so that
+    encoding and decoding can reuse them.  changes[i] belongs to the
+    branchpoint at indices[i] and starts at starts[i].
+    """
+    def __init__(self, branchpoints):
+        self.capacity = len(branchpoints)
+        if isinstance(branchpoints, CompactBranchpoints):
+            # kept in arrays, taking as little memory as the branchpoints
+            self.changes, self.indices = branchpoints.sorted_changes()
+            self.starts = self.changes.starts
+        else:
+            pairs = sorted((change, index)
+                           for index, branchpoint in enumerate(branchpoints)
+                           for change in branchpoint)
+            self.changes = [change for change, _ in pairs]
+            self.indices = [index for _, index in pairs]
+            self.starts = [change[0] for change in self.changes]
+
+    @classmethod
+    def from_sorted(cls, changes, indices, capacity, starts=None):
+        """
+        Wraps changes that are already sorted, and the index of the
+        branchpoint of each, as stored by the store module.
+        """
+        change_index = cls([])
+        change_index.capacity = capacity
+        change_index.changes = changes
+        change_index.indices = indices
+        change_index.starts = (starts if starts is not None else
+                               [change[0] for change in changes])
+        return change_index
+
+    def __len__(self):
+        return len(self.changes)
+
+    def starting_between(self, start, end):
+        """ the positions of the changes that start in [start, end) """
+        return range(bisect_left(self.starts, start),
+                     bisect_left(self.starts, end))
 
 
 def changeable_part(branchpoint, unchangeable_areas):
-    for start, end in unchangeable_areas:
-        for change in branchpoint:
-            if ((change[0] > start and change[0] < end) or
-                    (change[1] > start and change[1] < end) or
-                    (change[0] < start and change[1] > end)):
-                branchpoint = [c for c in branchpoint if c != change]
-    return branchpoint
+    """
+    Returns the changes of a branchpoint that do not overlap any of the
+    unchangeable areas, which can be given as a list of (start, end) tuples
+    or as an AreaIndex.  A change overlaps an area if either of its ends
+    lies strictly inside the area, or if it strictly contains the area.
+    """
+    if not isinstance(unchangeable_areas, AreaIndex):
+        unchangeable_areas = AreaIndex(unchangeable_areas)
+    return [change for change in branchpoint
+            if not unchangeable_areas.overlaps(change)]
 
 
-def find_unchangeable_areas(text):
-    url_re = re.compile('http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|'
-                        '(?:%[0-9a-fA-F][0-9a-fA-F]))+')
-    code_re = re.compile('```.+?```', re.DOTALL)
-    markdown_re = re.compile('[!]?\[[^\]]+?\]\([^)]+?\)', re.MULTILINE)
+class AreaIndex:
+    """
+    Unchangeable areas sorted by start index, so that whether a change
+    overlaps any of them takes a few binary searches instead of a pass over
+    every area.  The areas are not merged: two adjacent areas do not overlap
+    a change at the index where they meet, while a merged area would.
+    """
+    def __init__(self, areas):
+        areas = sorted(areas)
+        self.starts = [start for start, _ in areas]
+        ends = [end for _, end in areas]
+        # greatest end among the areas up to each index, and least end among
+        # the areas from each index on
+        self.max_ends = list(accumulate(ends, max))
+        self.min_ends = list(accumulate(reversed(ends), min))[::-1]
+
+    def overlaps(self, change):
+        change_start, change_end = change[0], change[1]
+        if not self.starts:
+            return False
+
+        # an area that starts before an end of the change and ends after it
+        for index in (change_start, change_end):
+            before = bisect_left(self.starts, index)
+            if before and self.max_ends[before - 1] > index:
+                return True
+
+        # an area that starts after the change starts and ends before it ends
+        after = bisect_right(self.starts, change_start)
+        return (after < len(self.starts) and
+                self.min_ends[after] < change_end)
+
+
+url_re = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|'
+                    r'(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+code_re = re.compile('```.+?```', re.DOTALL)
+markdown_re = re.compile(r'[!]?\[[^\]]+?\]\([^)]+?\)', re.MULTILINE)
+
 
+def find_unchangeable_areas(text):
     url = [m.span() for m in url_re.finditer(text)]
     code_markdown = [m.span() for m in code_re.finditer(text)]
     markdown_links = [m.span() for m in markdown_re.finditer(text)]
@@ -41,46 +168,37 @@ def find_unchangeable_areas(text):
     return code_markdown + url + markdown_links
 
 
-def ascii_branchpoints(text):
-    return get_tab_branchpoints(text) + get_contraction_branchpoints(text)
+def get_tab_branchpoints(text):
+    tab_indices = [m.start() for m in re.finditer('\t', text)]
+    return [[(tab_index, tab_index + 1, '    ')] for tab_index in tab_indices]
 
 
-def unicode_branchpoints(text):
-    return (get_directional_mark_branchpoints(text) +
-            get_non_breaking_branchpoints(text) +
-            get_zero_width_space_branchpoints(text))
+CONTRACTIONS = [
+    ("won't", "will not"),
+    ("can't", "cannot"),
+    ("isn't", "is not"),
+    ("doesn't", "does not"),
+    ("would've", "would have"),
+    ("how'll", "how will"),
+    ("hadn't", "had not"),
+]
 
 
-def global_branchpoints(text):
-    global_branchpoints = [get_single_quotes_branchpoint(text),
-                           get_single_digit_branchpoint(text)]
-    return [bp for bp in global_branchpoints if bp]
+def contraction_trie(contractions):
+    """
+    A trie of every contraction, replaced by its long form, and every long
+    form, replaced by its contraction, ranked in that order.
+    """
+    return Trie([replacement for contraction, long_form in contractions
+                 for replacement in ((contraction, long_form),
+                                     (long_form, contraction))])
 
 
-def get_tab_branchpoints(text):
-    tab_indices = [m.start() for m in re.finditer('\t', text)]
-    return [[(tab_index, tab_index + 1, '    ')] for tab_index in tab_indices]
+default_contraction_trie = contraction_trie(CONTRACTIONS)
 
 
 def get_contraction_branchpoints(text):
-    contractions = [
-        ("won't", "will not"),
-        ("can't", "cannot"),
-        ("isn't", "is not"),
-        ("doesn't", "does not"),
-        ("would've", "would have"),
-        ("how'll", "how will"),
-        ("hadn't", "had not"),
-    ]
-    branchpoints = []
-    for contraction, long_form in contractions:
-        for match in re.finditer(contraction, text):
-            start, end = match.span()
-            branchpoints.append([(start, end, long_form)])
-        for match in re.finditer(long_form, text):
-            start, end = match.span()
-            branchpoints.append([(start, end, contraction)])
-    return branchpoints
+    return default_contraction_trie.find(text)
 
 
 def get_single_quotes_branchpoint(text):
@@ -88,21 +206,23 @@ def get_single_quotes_branchpoint(text):
     return [(index, index + 1, "'") for index in double_quote_indices]
 
 
+digit_re = re.compile('(?<![\\d\\.])[1-9](?![\\d\\.])')
+NUMBERS = {
+        '9': 'nine',
+        '8': 'eight',
+        '7': 'seven',
+        '6': 'six',
+        '5': 'five',
+        '4': 'four',
+        '3': 'three',
+        '2': 'two',
+        '1': 'one'
+}
+
+
 def get_single_digit_branchpoint(text):
-    digit_re = re.compile('(?<![\d\.])[1-9](?![\d\.])')
-    numbers = {
-            '9': 'nine',
-            '8': 'eight',
-            '7': 'seven',
-            '6': 'six',
-            '5': 'five',
-            '4': 'four',
-            '3': 'three',
-            '2': 'two',
-            '1': 'one'
-    }
     single_digit_indices = [m.start() for m in digit_re.finditer(text)]
-    return [(index, index + 1, numbers[text[index]])
+    return [(index, index + 1, NUMBERS[text[index]])
             for index in single_digit_indices]
 
 
@@ -126,6 +246,324 @@ def get_zero_width_space_branchpoints(text):
             for index in word_beginnings]
 
 
+def build_scanner(contractions, rules, letters=True):
+    """
+    Compiles a single regular expression that finds the candidates of the
+    given built-in rules.  Each alternative is tagged with the rule it
+    belongs to.  Returns the expression, or None if no rule needs one.
+
+    The positions where contractions (a Trie) may start are matched inside a
+    lookahead, so they consume no text and the other rules still see every
+    character.  ASCII letters are handled by
+    the expression itself; any other character is matched and tested with
+    the same str methods as the per-rule functions.  If letters is False,
+    the alternatives for the directional mark, non-breaking and zero width
+    space rules are left out.
+    """
+    alternatives = []
+    first_chars = ''
+    if 'contraction' in rules and contractions.size:
+        contraction_starts = contractions.first_chars()
+        alternatives.append('(?=[{}])(?={})(?P<contraction>)'.format(
+            contraction_starts, contractions.pattern()))
+        first_chars += contraction_starts
+    if letters and 'zero_width_space' in rules:
+        alternatives.append('(?P<word_end>[a-z])(?=\\s)')
+        first_chars += 'a-z'
+    if letters and ('non_breaking' in rules or 'zero_width_space' in rules):
+        alternatives.append(
+            '(?P<capital>[A-Z])(?:(?=\\s)(?P<capital_word_end>))?')
+        first_chars += 'A-Z'
+    if 'single_quotes' in rules:
+        alternatives.append('(?P<quote>")')
+        first_chars += '"'
+    if letters and 'directional_mark' in rules:
+        alternatives.append('(?P<period>\\.(?=\\s))')
+        first_chars += '\\.'
+    if 'tab' in rules:
+        alternatives.append('(?P<tab>\\t)')
+        first_chars += '\\t'
+    if 'single_digit' in rules:
+        alternatives.append('(?P<digit>(?<![\\d\\.])[1-9](?![\\d\\.]))')
+        first_chars += '1-9'
+    if letters and ('non_breaking' in rules or 'zero_width_space' in rules):
+        alternatives.append('(?P<other>[^\\x00-\\x7f])')
+        first_chars += '\\x80-\\U0010ffff'
+
+    if not alternatives:
+        return None
+    # every alternative starts with one of first_chars, which lets the
+    # expression skip over all other characters quickly
+    return re.compile('(?=[{}])(?:{})'.format(first_chars,
+                                              '|'.join(alternatives)))
+
+
+# the named groups of the expressions compiled by build_scanner
+SCANNER_GROUPS = ('contraction', 'word_end', 'capital', 'capital_word_end',
+                  'quote', 'period', 'tab', 'digit', 'other')
+
+
+def scan_indices(text, scanner):
+    """ the start index of every match of each group of the scanner """
+    found = {name: [] for name in SCANNER_GROUPS}
+    if scanner is None:
+        return found
+    add = {number: found[name].append
+           for name, number in scanner.groupindex.items()}
+    for match in scanner.finditer(text):
+        add[match.lastindex](match.start())
+    return found
+
+
+def letter_indices(text, found):
+    """
+    Returns the indices of the periods followed by whitespace, of the
+    uppercase characters and of the alphabetic characters followed by
+    whitespace, from the matches of a scanner.
+    """
+    capitals = found['capital'] + found['capital_word_end']
+    word_ends = found['word_end'] + found['capital_word_end']
+    last = len(text) - 1
+    for index in found['other']:
+        char = text[index]
+        if char.isupper():
+            capitals.append(index)
+        if char.isalpha() and index < last and text[index + 1].isspace():
+            word_ends.append(index)
+    capitals.sort()
+    word_ends.sort()
+    return found['period'], capitals, word_ends
+
+
+class Rule:
+    """
+    A way of finding candidate branchpoints in a text.  find(text) returns
+    a list of branchpoints, or for a global rule a single branchpoint whose
+    changes are all made or not made together.
+    """
+    def __init__(self, name, find, is_global=False):
+        self.name = name
+        self.find = find
+        self.is_global = is_global
+
+
+# every rule that an Analyzer can use, by name, in the order in which their
+# candidates are combined
+RULES = {}
+
+
+def register_rule(name, find, is_global=False):
+    """
+    Adds a rule to the registry, after the rules already in it.  Analyzers
+    created afterwards can use it; the rules of existing analyzers do not
+    change, and the module functions (get_all_branchpoints, the stream and
+    parallel analyses) keep using the built-in rules.
+
+    :param name: A name that identifies the rule, also in cache keys.
+    :param find: A function of a text that returns the candidate
+                 branchpoints of the rule, or for a global rule a single
+                 branchpoint.
+    :param is_global: Whether the rule makes a single branchpoint.
+    """
+    if name in RULES:
+        raise ValueError('A rule named {!r} is already registered.'.format(
+            name))
+    RULES[name] = Rule(name, find, is_global)
+    return RULES[name]
+
+
+register_rule('tab', get_tab_branchpoints)
+register_rule('contraction', get_contraction_branchpoints)
+register_rule('directional_mark', get_directional_mark_branchpoints)
+register_rule('non_breaking', get_non_breaking_branchpoints)
+register_rule('zero_width_space', get_zero_width_space_branchpoints)
+register_rule('single_quotes', get_single_quotes_branchpoint,
+              is_global=True)
+register_rule('single_digit', get_single_digit_branchpoint, is_global=True)
+
+# the rules above, which an analyzer finds in a single pass over the text
+# rather than by calling their functions
+BUILTIN_RULES = tuple(RULES)
+
+
+class Analyzer:
+    """
+    Finds the branchpoints of texts with a set of rules that is compiled
+    once.
+
+    >> analyzer = Analyzer(disabled=['zero_width_space', 'non_breaking'])
+    >> branchpoints = analyzer.get_all_branchpoints(text)
+    >> steganos.encode('101', text, branchpoints)
+
+    :param rules (Optional): The names of the registered rules to use.
+                             Defaults to every registered rule.
+    :param disabled (Optional): Names of rules not to use.
+    :param contractions (Optional): The pairs of contractions and long forms
+                                    used by the contraction rule.
+    """
+    def __init__(self, rules=None, disabled=(), contractions=CONTRACTIONS):
+        rules = list(RULES) if rules is None else list(rules)
+        for name in list(rules) + list(disabled):
+            if name not in RULES:
+                raise ValueError('Unknown rule {!r}. Expected one of {}.'
+                                 .format(name, ', '.join(RULES)))
+        self.rules = tuple(name for name in rules if name not in disabled)
+        self.contractions = [tuple(pair) for pair in contractions]
+        self.local_rules = tuple(name for name in self.rules
+                                 if not RULES[name].is_global)
+        self.global_rules = tuple(name for name in self.rules
+                                  if RULES[name].is_global)
+        # the functions of the rules, for those that scan does not find
+        # itself
+        self.finders = {name: RULES[name].find for name in self.rules}
+
+        self.contraction_trie = contraction_trie(self.contractions)
+
+        self.scanner = build_scanner(self.contraction_trie, self.rules)
+        # used along with the NumPy backend, which handles the letter rules
+        self.symbol_scanner = build_scanner(self.contraction_trie, self.rules,
+                                            letters=False)
+        self.ruleset = self.identify()
+
+    def identify(self):
+        """
+        A stable identifier of the rule set, used in cache keys.  The default
+        rules are identified as RULESET.
+        """
+        if (self.rules == BUILTIN_RULES and
+                self.contractions == [tuple(pair) for pair in CONTRACTIONS]):
+            return RULESET
+        ruleset = '+'.join(self.rules)
+        if 'contraction' in self.rules:
+            digest = hashlib.sha256(repr(self.contractions).encode('utf8'))
+            ruleset += '/contractions:' + digest.hexdigest()[:16]
+        return ruleset
+
+    def get_all_branchpoints(self, text, strategy=GREEDY, processes=None):
+        """ as the module function of the same name, with these rules """
+        branchpoint_cache = cache.active_cache()
+        if branchpoint_cache is None:
+            return self.analyze(text, strategy, processes)
+
+        key = cache.cache_key(text, (self.ruleset, strategy))
+        branchpoints = branchpoint_cache.get(key)
+        if branchpoints is None:
+            branchpoints = self.analyze(text, strategy, processes)
+            branchpoint_cache.put(key, branchpoints)
+        return branchpoints
+
+    def analyze(self, text, strategy, processes):
+        if processes is None:
+            return self.find_all_branchpoints(text, strategy)
+        if self.ruleset != RULESET:
+            raise ValueError('Only the default rules can be used to analyze '
+                             'a text in parallel.')
+        # segments builds on this module
+        from .segments import find_branchpoints_in_parallel
+        return find_branchpoints_in_parallel(text, processes, strategy)
+
+    def find_all_branchpoints(self, text, strategy=GREEDY):
+        stages = None
+        if instrumentation.enabled():
+            stages = instrumentation.Stages(text, self.rules)
+        candidates = self.find_candidate_branchpoints(text, stages)
+        branchpoints = mutually_exclusive_branchpoints(candidates, strategy)
+        if stages is not None:
+            kept = {id(bp) for bp in branchpoints}
+            rules = [rule for bp, rule in zip(candidates, stages.rules)
+                     if id(bp) in kept]
+            stages.finish('mutually_exclusive_branchpoints', branchpoints,
+                          rules)
+        return branchpoints
+
+    def find_candidate_branchpoints(self, text, stages=None):
+        """
+        Returns every branchpoint of a text that can be changed, before
+        intersecting branchpoints are dropped.
+
+        :param stages (Optional): An instrumentation.Stages that each stage
+                                  of the analysis is reported to.
+        """
+        candidates = self.scan(text)
+        if stages is not None:
+            found = [(rule, bp) for rule, bps in candidates.items()
+                     for bp in (bps if rule in self.local_rules else [bps])]
+            rule_of = {id(bp): rule for rule, bp in found}
+            stages.finish('scan', [bp for _, bp in found],
+                          [rule for rule, _ in found])
+
+        # local and unicode branchpoints are sorted to maximize the
+        # information that can be retrieved from any contiguous piece of
+        # encoded text
+        sorted_branchpoints = sort_branchpoints(
+            [bp for rule in self.local_rules for bp in candidates[rule]])
+        global_branchpoints = [candidates[rule] for rule in self.global_rules]
+        branchpoints = ([bp for bp in global_branchpoints if bp] +
+                        sorted_branchpoints)
+        if stages is not None:
+            rules = [rule_of[id(bp)] for bp in branchpoints]
+            stages.finish('sort_branchpoints', branchpoints, rules)
+
+        unchangeable_areas = AreaIndex(find_unchangeable_areas(text))
+        changeable_branchpoints = [changeable_part(bp, unchangeable_areas)
+                                   for bp in branchpoints]
+        filtered_branchpoints = [bp for bp in changeable_branchpoints if bp]
+        if stages is not None:
+            rules = [rule for bp, rule in zip(changeable_branchpoints, rules)
+                     if bp]
+            stages.finish('changeable_part', filtered_branchpoints, rules)
+
+        nored_branchpoints = remove_redundant_characters(
+            text, filtered_branchpoints)
+        if stages is not None:
+            stages.finish('remove_redundant_characters', nored_branchpoints,
+                          rules)
+        return nored_branchpoints
+
+    def scan(self, text):
+        """
+        Finds the candidate branchpoints of every rule, with those of the
+        built-in rules found in a single pass over the text.  Returns a
+        dictionary from rule name to the branchpoints that the function for
+        that rule returns, in the same order.
+
+        If NumPy is installed, the built-in rules that test every character
+        are computed by the vectorized module instead.
+        """
+        letter_rules = {'directional_mark', 'non_breaking',
+                        'zero_width_space'}
+        if vectorized.numpy is None or not letter_rules & set(self.rules):
+            found = scan_indices(text, self.scanner)
+            periods, capitals, word_ends = letter_indices(text, found)
+        else:
+            found = scan_indices(text, self.symbol_scanner)
+            # kept as index arrays until the rule that uses each of them
+            # builds its branchpoints
+            periods, capitals, word_ends = (
+                vectorized.character_rule_indices(text))
+
+        to_list = vectorized.to_list
+        builtin = {
+            'tab': lambda: [[(index, index + 1, '    ')]
+                            for index in found['tab']],
+            'contraction': lambda: self.contraction_trie.find(
+                text, found['contraction']),
+            'directional_mark': lambda: [[(index, index, '\u200f\u200e')]
+                                         for index in to_list(periods)],
+            'non_breaking': lambda: [[(index + 1, index + 1, '\u2060')]
+                                     for index in to_list(capitals)],
+            'zero_width_space': lambda: [[(index + 1, index + 1, '\u200b')]
+                                         for index in to_list(word_ends)],
+            'single_quotes': lambda: [(index, index + 1, "'")
+                                      for index in found['quote']],
+            'single_digit': lambda: [(index, index + 1, NUMBERS[text[index]])
+                                     for index in found['digit']],
+        }
+        return {name: (builtin[name]() if name in builtin
+                       else self.finders[name](text))
+                for name in self.rules}
+
+
 def remove_redundant_characters(original_text, branchpoints):
     """
     This function removes redundant characters for all changes in a list of
@@ -190,46 +628,173 @@ def branchpoint_area(items):
     return len(items) * sum(i[1] - i[0] for i in items)
 
 
-def mutually_exclusive_branchpoints(data):
+def mutually_exclusive_branchpoints(data, strategy=GREEDY):
     """
     Data is list of lists of intervals. We'd like to keep the most number of
     high level lists such that none of the intervals intersect.
 
+    :param strategy: GREEDY for the fast approximate solution of
+                     greedy_branchpoints, or OPTIMAL for the exact solution
+                     of optimal_branchpoints.
+    """
+    to_remove = removed_branchpoints(data, strategy)
+    return [d for i, d in enumerate(data) if i not in to_remove]
+
+
+def removed_branchpoints(data, strategy=GREEDY):
+    """
+    Returns the indices of the branchpoints that
+    mutually_exclusive_branchpoints drops, so that data such as a
+    CompactBranchpoints can be filtered without building a list of it.
+    """
+    if strategy == GREEDY:
+        return greedy_removals(data)
+    if strategy == OPTIMAL:
+        return optimal_removals(data)
+    raise ValueError('Unknown strategy {!r}. Expected one of {}.'.format(
+        strategy, ', '.join(STRATEGIES)))
+
+
+def greedy_branchpoints(data):
+    """
     This is an approximate, greedy, solution that guarantees no intersection
     but may not be the optimal solution.  It runs at O(n logn) so that's not
     bad.
     """
-    data_expanded = [(*d, branchpoint_area(items), i)
-                     for i, items in enumerate(data)
-                     for d in items]
-    data_expanded.sort(key=lambda item: item[0])
+    to_remove = greedy_removals(data)
+    return [d for i, d in enumerate(data) if i not in to_remove]
+
+
+def greedy_removals(data):
+    """ the indices of the branchpoints that the greedy solution drops """
+    # the changes are kept in arrays sorted by start rather than in a list
+    # of tuples, which would take several times the memory of a
+    # CompactBranchpoints
+    starts = array('q')
+    ends = array('q')
+    owners = array('q')
+    areas = array('q')
+    for i, items in enumerate(data):
+        areas.append(branchpoint_area(items))
+        for change in items:
+            starts.append(change[0])
+            ends.append(change[1])
+            owners.append(i)
+    order = sort_order(starts)
+    starts = array('q', (starts[k] for k in order))
+    ends = array('q', (ends[k] for k in order))
+    owners = array('q', (owners[k] for k in order))
+    del order
+
     to_remove = set()
     i = 0
-    de = data_expanded
-    while i < len(de) - 1:
+    count = len(starts)
+    # following[k] is an index after k such that every item between them is
+    # marked for deletion.  It is moved forward as items are deleted, so that
+    # long runs of deleted items are only skipped over once.
+    following = array('q', range(1, count + 1))
+
+    def next_item(k):
+        j = following[k]
+        skipped = []
+        while j < count and owners[j] in to_remove:
+            skipped.append(j)
+            j = following[j]
+        for s in skipped:
+            following[s] = j
+        following[k] = j
+        return j
+
+    while i < count - 1:
         # make sure current element is not marked for deletion
-        if de[i][4] not in to_remove:
+        if owners[i] not in to_remove:
             # now we make sure the next item to compare against isn't marked
             # for deletion
-            j = i + 1
-            try:
-                while de[j][4] in to_remove:
-                    j += 1
-            except IndexError:
+            j = next_item(i)
+            if j == count:
                 break
             # check if this endpoint is after the next items start
-            if de[i][1] >= de[j][0]:
-                this_area = de[i][3]
-                next_area = de[j][3]
+            if ends[i] >= starts[j]:
+                this_area = areas[owners[i]]
+                next_area = areas[owners[j]]
                 # pick the item with the least "area" in terms of the higher
                 # order list of intervals. This is a heuristic to remove long
                 # lists of small intervals. We want those out because they have
                 # a higher probability of intersecting with many other lists of
                 # intervals.
                 if this_area < next_area:
-                    to_remove.add(de[j][4])
+                    to_remove.add(owners[j])
                 else:
-                    to_remove.add(de[i][4])
+                    to_remove.add(owners[i])
                 i -= 1
         i += 1
+    return to_remove
+
+
+def optimal_branchpoints(data, max_steps=OPTIMAL_MAX_STEPS):
+    """
+    Keeps the largest possible number of branchpoints.
+
+    Two changes intersect if they share any index, ends included, and a
+    branchpoint whose own changes intersect can never be kept.  Only a few
+    branchpoints (the global ones) have more than one change, so every
+    combination of those is tried, and for each the most branchpoints of a
+    single change that fit around them are found by keeping the change that
+    ends first at every step, which is optimal for intervals.
+
+    If trying every combination would take more than max_steps steps, the
+    greedy solution is returned instead, so the result only depends on the
+    data.  It is never worse than the greedy solution, which is returned on
+    ties.
+    """
+    to_remove = optimal_removals(data, max_steps)
     return [d for i, d in enumerate(data) if i not in to_remove]
+
+
+def optimal_removals(data, max_steps=OPTIMAL_MAX_STEPS):
+    """ the indices of the branchpoints that optimal_branchpoints drops """
+    singles = sorted((items[0][1], items[0][0], i)
+                     for i, items in enumerate(data) if len(items) == 1)
+    multiples = [i for i, items in enumerate(data)
+                 if len(items) > 1 and not intersecting(sorted(items))]
+
+    greedy_removed = greedy_removals(data)
+    best = set(range(len(data))) - greedy_removed
+
+    # every combination of the multiples considers each single once
+    steps = len(singles) + sum(len(data[i]) for i in multiples)
+    if steps << len(multiples) > max_steps:
+        return greedy_removed
+
+    for size in range(len(multiples), -1, -1):
+        for chosen in combinations(multiples, size):
+            taken = sorted(change for i in chosen for change in data[i])
+            if intersecting(taken):
+                continue
+            taken_starts = [change[0] for change in taken]
+
+            kept = set(chosen)
+            last_end = None
+            for end, start, i in singles:
+                if last_end is not None and start <= last_end:
+                    continue
+                # the only change taken that could intersect this one is the
+                # last that starts before this one ends
+                before = bisect_right(taken_starts, end)
+                if before and taken[before - 1][1] >= start:
+                    continue
+                kept.add(i)
+                last_end = end
+
+            if len(kept) > len(best):
+                best = kept
+    return set(range(len(data))) - best
+
+
+def intersecting(changes):
+    """ whether any two of a sorted list of changes intersect """
+    return any(previous[1] >= change[0]
+               for previous, change in zip(changes, changes[1:]))
+
+
+DEFAULT_ANALYZER = Analyzer(BUILTIN_RULES)
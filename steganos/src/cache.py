@@ -0,0 +1,127 @@
+"""
+An opt-in cache of branchpoint analyses.
+
+Finding the branchpoints of a text only depends on the text and on the rules
+used to find them, so the result can be shared between calls that see the
+same original text.  The cache is keyed by a hash of the text together with
+an identifier of the rule set, and is bounded both by number of entries and
+by an estimate of the memory held by the cached branchpoints.  The least
+recently used entries are evicted first.
+
+The cache is off by default:
+
+>> steganos.enable_cache(max_entries=500, max_bytes=256 * 2**20)
+>> steganos.cache_info()
+{'hits': 0, 'misses': 0, 'entries': 0, 'bytes': 0, ...}
+
+Cached branchpoints are shared between callers and must not be modified.
+"""
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+
+class BranchpointCache:
+    def __init__(self, max_entries=128, max_bytes=64 * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, branchpoints):
+        size = branchpoints_size(branchpoints)
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes or self.max_entries < 1:
+                return
+            self._entries[key] = (branchpoints, size)
+            self.bytes += size
+            while (len(self._entries) > self.max_entries or
+                    self.bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+        }
+
+
+def cache_key(text, ruleset):
+    digest = hashlib.sha256(text.encode('utf8', 'surrogatepass')).hexdigest()
+    return (ruleset, digest)
+
+
+def branchpoints_size(branchpoints):
+    """ estimates the number of bytes held by a list of branchpoints """
+    if hasattr(branchpoints, 'nbytes'):
+        return branchpoints.nbytes
+    size = sys.getsizeof(branchpoints)
+    for branchpoint in branchpoints:
+        size += sys.getsizeof(branchpoint)
+        for start, end, change_string in branchpoint:
+            size += (sys.getsizeof((start, end, change_string)) +
+                     sys.getsizeof(start) + sys.getsizeof(end) +
+                     sys.getsizeof(change_string))
+    return size
+
+
+_active_cache = None
+
+
+def enable_cache(max_entries=128, max_bytes=64 * 2**20):
+    """
+    Turns on caching of branchpoint analyses.
+
+    :param max_entries: The maximum number of texts to keep analyses for.
+    :param max_bytes: The maximum estimated size in bytes of all cached
+                      analyses.
+    :return: The BranchpointCache that is now active.
+    """
+    global _active_cache
+    _active_cache = BranchpointCache(max_entries, max_bytes)
+    return _active_cache
+
+
+def disable_cache():
+    global _active_cache
+    _active_cache = None
+
+
+def active_cache():
+    return _active_cache
+
+
+def cache_info():
+    """
+    Returns hit/miss and size statistics for the active cache, or None if
+    caching is disabled.
+    """
+    return _active_cache.info() if _active_cache is not None else None
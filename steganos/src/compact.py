@@ -0,0 +1,197 @@
+"""
+A compact representation of a list of branchpoints.
+
+A list of branchpoints holds a list and a tuple for every change, which
+takes around 200 bytes per change.  CompactBranchpoints stores the start and
+end of every change in two arrays, the string of every change as an index
+into a table of the distinct strings, and the index of the first change of
+every branchpoint in a fourth array, which takes under 30 bytes per change.
+
+It behaves as a read-only list of branchpoints: indexing it or iterating
+over it builds the lists of changes on the fly, so it can be passed
+wherever branchpoints are expected.
+
+>> branchpoints = CompactBranchpoints(get_all_branchpoints(text))
+>> encoded_text = steganos.encode('101', text, branchpoints)
+"""
+import sys
+from array import array
+from collections.abc import Sequence
+from itertools import repeat
+
+
+class CompactBranchpoints(Sequence):
+    def __init__(self, branchpoints=()):
+        self.starts = array('q')
+        self.ends = array('q')
+        self.string_ids = array('I')
+        # branchpoint i is made of the changes offsets[i] to offsets[i + 1]
+        self.offsets = array('q', [0])
+        self.strings = []
+        self._string_ids = {}
+        for branchpoint in branchpoints:
+            self.append(branchpoint)
+
+    @classmethod
+    def from_columns(cls, starts, ends, string_ids, offsets, strings):
+        """
+        Wraps existing columns, such as memoryviews of a file loaded by the
+        store module, without copying them.
+        """
+        compact = cls()
+        compact.starts = starts
+        compact.ends = ends
+        compact.string_ids = string_ids
+        compact.offsets = offsets
+        compact.strings = list(strings)
+        compact._string_ids = {string: string_id for string_id, string
+                               in enumerate(compact.strings)}
+        return compact
+
+    def append(self, branchpoint):
+        for start, end, change_string in branchpoint:
+            self.starts.append(start)
+            self.ends.append(end)
+            self.string_ids.append(self._string_id(change_string))
+        self.offsets.append(len(self.starts))
+
+    def extend(self, branchpoints):
+        """
+        Appends every branchpoint, copying the columns of another
+        CompactBranchpoints directly.
+        """
+        if not isinstance(branchpoints, CompactBranchpoints):
+            for branchpoint in branchpoints:
+                self.append(branchpoint)
+            return
+        string_ids = [self._string_id(change_string)
+                      for change_string in branchpoints.strings]
+        base = len(self.starts)
+        self.starts.extend(branchpoints.starts)
+        self.ends.extend(branchpoints.ends)
+        self.string_ids.extend(string_ids[string_id]
+                               for string_id in branchpoints.string_ids)
+        self.offsets.extend(base + offset
+                            for offset in branchpoints.offsets[1:])
+
+    def _string_id(self, change_string):
+        string_id = self._string_ids.get(change_string)
+        if string_id is None:
+            string_id = self._string_ids[change_string] = len(self.strings)
+            self.strings.append(change_string)
+        return string_id
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('branchpoint index out of range')
+        return self.changes(self.offsets[index], self.offsets[index + 1])
+
+    def __iter__(self):
+        offsets = self.offsets
+        for index in range(len(self)):
+            yield self.changes(offsets[index], offsets[index + 1])
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            mine == list(theirs) for mine, theirs in zip(self, other))
+
+    def changes(self, first, last):
+        """ the changes from index first up to index last, as tuples """
+        strings = self.strings
+        return [(start, end, strings[string_id])
+                for start, end, string_id
+                in zip(self.starts[first:last], self.ends[first:last],
+                       self.string_ids[first:last])]
+
+    def sorted_changes(self):
+        """
+        Returns the changes sorted as in branchpoints.ChangeIndex, as a
+        CompactChanges that shares the table of strings, and the index of
+        the branchpoint of each change in an array.
+        """
+        offsets = self.offsets
+        branchpoint_indices = array('q')
+        for index in range(len(self)):
+            branchpoint_indices.extend(
+                repeat(index, offsets[index + 1] - offsets[index]))
+
+        starts, ends, string_ids = self.starts, self.ends, self.string_ids
+        strings = self.strings
+        # sorting by start alone keeps changes that start together in the
+        # order of their branchpoints, and only those (few) runs are sorted
+        # by the rest of the key, so no tuple is built for every change
+        order = sort_order(starts)
+        run = 0
+        for position in range(1, len(order) + 1):
+            if (position == len(order) or
+                    starts[order[position]] != starts[order[run]]):
+                if position - run > 1:
+                    order[run:position] = array('q', sorted(
+                        order[run:position],
+                        key=lambda i: (ends[i], strings[string_ids[i]],
+                                       branchpoint_indices[i])))
+                run = position
+        changes = CompactChanges(array('q', (starts[i] for i in order)),
+                                 array('q', (ends[i] for i in order)),
+                                 array('I', (string_ids[i] for i in order)),
+                                 strings)
+        return changes, array('q', (branchpoint_indices[i] for i in order))
+
+    @property
+    def nbytes(self):
+        """ an estimate of the number of bytes held """
+        columns = (self.starts, self.ends, self.string_ids, self.offsets)
+        size = sum(sys.getsizeof(column) for column in columns)
+        size += sys.getsizeof(self.strings) + sys.getsizeof(self._string_ids)
+        return size + sum(sys.getsizeof(s) for s in self.strings)
+
+    def __repr__(self):
+        return 'CompactBranchpoints({!r})'.format(list(self))
+
+
+def sort_order(values):
+    """
+    Returns, as an array, the indices of an array of non-negative integers
+    in the order that sorts it, equal values keeping their order.  Each value
+    is packed with its index into a single integer, so sorting them builds
+    neither tuples nor a separate list of keys.
+    """
+    count = len(values) or 1
+    keys = sorted(value * count + index for index, value in enumerate(values))
+    return array('q', (key % count for key in keys))
+
+
+class CompactChanges(Sequence):
+    """
+    A read-only list of changes stored in columns like those of
+    CompactBranchpoints; indexing it builds the change tuple on the fly.
+    """
+    def __init__(self, starts, ends, string_ids, strings):
+        self.starts = starts
+        self.ends = ends
+        self.string_ids = string_ids
+        self.strings = strings
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return (self.starts[index], self.ends[index],
+                self.strings[self.string_ids[index]])
+
+    def __iter__(self):
+        strings = self.strings
+        for start, end, string_id in zip(self.starts, self.ends,
+                                         self.string_ids):
+            yield (start, end, strings[string_id])
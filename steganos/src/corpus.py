@@ -0,0 +1,239 @@
+"""
+Finds which of many original texts a piece of encoded text came from.
+
+A CorpusIndex holds fingerprints of every original text: hashes of short
+substrings ('grams') of a normalized copy of the text, in which the
+characters that encoding inserts are dropped, runs of whitespace become a
+single space and double quotes become single quotes, so that encoding
+changes as few grams as possible.  Of the hashes of every window of
+consecutive grams only the smallest is kept ('winnowing'), so any stretch of
+at least WINDOW + GRAM - 1 normalized characters that a piece of encoded text
+shares with an original is guaranteed to share a fingerprint with it.
+
+The fingerprints of all the texts are sorted by hash, so looking up a piece
+takes a binary search per fingerprint of the piece, however large the
+corpus.  The index can be built offline and saved, and loading it maps the
+file rather than reading it:
+
+>> index = CorpusIndex.build((name, read(name)) for name in names)
+>> save_corpus(index, 'corpus.stg')
+>> index = load_corpus('corpus.stg')
+>> index.attribute(leaked_text, lambda name: load_plan(name + '.stg'))
+[('report-7', '1011...')]
+"""
+import re
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from .alignment import INSERTED_CHARACTERS
+from .store import map_columns, write_columns
+from . import vectorized
+
+GRAM = 16
+WINDOW = 16
+# fingerprints shared by more texts than this (boilerplate, common phrases)
+# say little about where a piece came from, and are ignored when looking up
+MAX_POSTINGS = 64
+# the number of candidate texts that attribute tries to decode
+TOP = 3
+
+# runs of whitespace and inserted characters, which are replaced by a single
+# space, or dropped if they only contain inserted characters
+skipped_re = re.compile('[\\s{}]+'.format(INSERTED_CHARACTERS))
+QUOTE_TABLE = {ord('"'): "'"}
+
+
+def normalize(text):
+    """
+    Returns the normalized text, and the starts of the pieces copied from the
+    text into it as two arrays: the index in the normalized text and the
+    index in the text of each piece.
+    """
+    pieces = []
+    normalized_starts = array('q')
+    starts = array('q')
+    position = 0
+    length = 0
+    for match in skipped_re.finditer(text):
+        normalized_starts.append(length)
+        starts.append(position)
+        piece = text[position:match.start()]
+        if not match.group().strip(INSERTED_CHARACTERS):
+            pieces.append(piece)
+        else:
+            pieces.append(piece + ' ')
+            length += 1
+        length += len(piece)
+        position = match.end()
+    normalized_starts.append(length)
+    starts.append(position)
+    pieces.append(text[position:])
+    return ''.join(pieces).translate(QUOTE_TABLE), normalized_starts, starts
+
+
+def text_index(normalized_index, normalized_starts, starts):
+    """ the index in the text of an index of the normalized text """
+    piece = bisect_right(normalized_starts, normalized_index) - 1
+    return starts[piece] + normalized_index - normalized_starts[piece]
+
+
+def fingerprints(text, gram=GRAM, window=WINDOW):
+    """
+    Yields the hash and the index in the text of every fingerprint of a
+    text, in ascending order of index.
+    """
+    normalized, normalized_starts, starts = normalize(text)
+    hashes = [zlib.crc32(normalized[index:index + gram].encode(
+                  'utf8', 'surrogatepass'))
+              for index in range(len(normalized) - gram + 1)]
+    for index in winnow(hashes, window):
+        yield hashes[index], text_index(index, normalized_starts, starts)
+
+
+def winnow(hashes, window):
+    """
+    Returns the indices of the smallest hash of every window of consecutive
+    hashes (the rightmost one, if several are equal), each index once.  A
+    sequence shorter than a window is a single window.
+    """
+    selected = []
+    # indices of the hashes that may still be the smallest of a window, with
+    # ascending hashes
+    candidates = []
+    first = 0
+    for index, key in enumerate(hashes):
+        while len(candidates) > first and hashes[candidates[-1]] >= key:
+            candidates.pop()
+        candidates.append(index)
+        if candidates[first] <= index - window:
+            first += 1
+        if index >= window - 1 and (not selected or
+                                    selected[-1] != candidates[first]):
+            selected.append(candidates[first])
+    if hashes and len(hashes) < window:
+        selected.append(candidates[first])
+    return selected
+
+
+class CorpusIndex:
+    """
+    The fingerprints of a corpus of original texts, sorted by hash.  The
+    fingerprint at position i has hash keys[i] and lies at index
+    offsets[i] of the text named names[documents[i]].
+    """
+    def __init__(self, names, keys, documents, offsets, gram=GRAM,
+                 window=WINDOW):
+        self.names = names
+        self.keys = keys
+        self.documents = documents
+        self.offsets = offsets
+        self.gram = gram
+        self.window = window
+
+    @classmethod
+    def build(cls, texts, gram=GRAM, window=WINDOW):
+        """
+        :param texts: An iterable of (name, original text) pairs.  Names
+                      must be strings.
+        """
+        names = []
+        keys = array('I')
+        documents = array('I')
+        offsets = array('q')
+        for name, text in texts:
+            for key, offset in fingerprints(text, gram, window):
+                keys.append(key)
+                documents.append(len(names))
+                offsets.append(offset)
+            names.append(name)
+
+        order = sort_order(keys)
+        return cls(names, array('I', (keys[i] for i in order)),
+                   array('I', (documents[i] for i in order)),
+                   array('q', (offsets[i] for i in order)), gram, window)
+
+    def __len__(self):
+        return len(self.names)
+
+    def candidates(self, encoded_text, limit=10):
+        """
+        Returns up to limit texts that the encoded text may have come from,
+        best first, as (name, start, score) tuples.  start estimates the
+        index of the original text at which the encoded text starts (changes
+        made near its start can shift the estimate by a few characters), and
+        score is the fraction of the fingerprints of the encoded text found
+        in that text.
+        """
+        found = defaultdict(list)
+        count = 0
+        for key, position in fingerprints(encoded_text, self.gram,
+                                          self.window):
+            count += 1
+            first = bisect_left(self.keys, key)
+            last = bisect_right(self.keys, key, first)
+            if last - first > MAX_POSTINGS:
+                continue
+            # a fingerprint found several times in a text counts once, at
+            # its first occurrence
+            seen = set()
+            for index in range(first, last):
+                document = self.documents[index]
+                if document not in seen:
+                    seen.add(document)
+                    found[document].append(self.offsets[index] - position)
+
+        # changes within the encoded text shift the estimates of later
+        # fingerprints, so the start is estimated from the first one
+        ranked = sorted(found.items(), key=lambda item: -len(item[1]))
+        return [(self.names[document], max(starts[0], 0),
+                 len(starts) / count)
+                for document, starts in ranked[:limit]]
+
+    def attribute(self, encoded_text, plan_for, message_bits=None, top=TOP):
+        """
+        Decodes the encoded text with each of the top candidate texts it may
+        have come from, and returns the name and the bits decoded of those it
+        can be decoded with, best first.
+
+        :param plan_for: A function of the name of a text that returns a
+                         Plan of that text, for example by loading it with
+                         load_plan.
+        :param message_bits: number of bits in message.
+        :param top: How many candidates to try.
+        """
+        attributions = []
+        for name, _, _ in self.candidates(encoded_text, top):
+            try:
+                bits = plan_for(name).decode_partial_text(
+                    encoded_text, message_bits=message_bits)
+            except ValueError:
+                continue
+            attributions.append((name, bits))
+        return attributions
+
+
+def sort_order(keys):
+    """ the indices of the keys in ascending order of key """
+    if vectorized.numpy is not None:
+        numpy = vectorized.numpy
+        return numpy.argsort(numpy.frombuffer(keys, dtype=numpy.uint32),
+                             kind='stable').tolist()
+    return sorted(range(len(keys)), key=keys.__getitem__)
+
+
+def save_corpus(index, path):
+    """ writes a CorpusIndex to a file, see the store module """
+    write_columns(path, {'kind': 'corpus', 'names': index.names,
+                         'gram': index.gram, 'window': index.window},
+                  [('keys', 'I', index.keys),
+                   ('documents', 'I', index.documents),
+                   ('offsets', 'q', index.offsets)])
+
+
+def load_corpus(path):
+    """ maps a file written by save_corpus as a CorpusIndex """
+    header, column = map_columns(path, 'corpus')
+    return CorpusIndex(header['names'], column('keys'), column('documents'),
+                       column('offsets'), header['gram'], header['window'])
@@ -0,0 +1,105 @@
+"""
+Opt-in reporting of where the time goes when the branchpoints of a text are
+found.
+
+While an instrument() block is active, every analysis done by
+get_all_branchpoints reports one record per stage: the stage name, its wall
+time in seconds, the number of changes of each rule that are left after it
+and the number of changes of each rule that it dropped.  The stages are, in
+order:
+
+- 'scan': finding the candidates of every rule,
+- 'sort_branchpoints': ordering the candidates,
+- 'changeable_part': dropping changes inside unchangeable areas, including
+  the time spent in find_unchangeable_areas,
+- 'remove_redundant_characters',
+- 'mutually_exclusive_branchpoints'.
+
+All rules are matched in a single pass, so the 'scan' record gives the
+candidate count of each rule but a single time for all of them; the
+benchmark module times each rule on its own.  Analyses served from the cache
+or run on segments of a text (as by the streaming and parallel functions)
+are not reported.
+
+>> with instrument() as report:
+..     steganos.bit_capacity(text)
+>> report.records[0]
+{'stage': 'scan', 'seconds': 0.08, 'changes': {'tab': 3, ...}, ...}
+"""
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+_reports = []
+
+
+class Report:
+    def __init__(self, callback=None):
+        self.records = []
+        self.callback = callback
+
+    def add(self, record):
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def totals(self):
+        """ the total seconds spent in each stage over all records """
+        totals = Counter()
+        for record in self.records:
+            totals[record['stage']] += record['seconds']
+        return dict(totals)
+
+
+@contextmanager
+def instrument(callback=None):
+    """
+    Collects a record of every stage of every analysis made in the block.
+
+    :param callback (Optional): Called with each record as it is made, for
+                                example to forward it to a metrics system.
+    :return: A Report whose records attribute lists the records.
+    """
+    report = Report(callback)
+    _reports.append(report)
+    try:
+        yield report
+    finally:
+        _reports.remove(report)
+
+
+def enabled():
+    return bool(_reports)
+
+
+class Stages:
+    """
+    Times the consecutive stages of one analysis.  Each stage is finished
+    with the branchpoints left after it and the rule of each of them.  The
+    names of all rules are given up front so that rules without any
+    candidates are reported too.
+    """
+    def __init__(self, text, rule_names=()):
+        self.text_length = len(text)
+        self.rule_names = rule_names
+        self.previous = None
+        self.rules = None
+        self.last = time.perf_counter()
+
+    def finish(self, stage, branchpoints, rules):
+        seconds = time.perf_counter() - self.last
+        changes = Counter(dict.fromkeys(self.rule_names, 0))
+        for branchpoint, rule in zip(branchpoints, rules):
+            changes[rule] += len(branchpoint)
+
+        record = {'stage': stage, 'seconds': seconds,
+                  'text_length': self.text_length, 'changes': dict(changes)}
+        if self.previous is not None:
+            record['dropped'] = {rule: count - changes[rule]
+                                 for rule, count in self.previous.items()}
+        for report in _reports:
+            report.add(record)
+
+        self.previous = changes
+        self.rules = rules
+        self.last = time.perf_counter()
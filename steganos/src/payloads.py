@@ -0,0 +1,171 @@
+"""
+A registry of the payloads issued to recipients, to find which recipient a
+decoded message belongs to.
+
+Decoding often cannot recover every bit, and returns '?' for those it
+cannot.  The registry finds the issued payloads closest to a decoded
+message, counting only the bits that were recovered: the distance to a
+payload is the number of recovered bits that differ from it.
+
+Payloads are stored packed, one row of whole 64 bit words per payload, and
+compared a word at a time.  With NumPy installed every row is compared at
+once; otherwise the rows are compared one by one as Python integers.
+
+>> registry = PayloadRegistry(32)
+>> registry.add('alice', '0110...')
+>> registry.match(steganos.decode_partial_text(leaked_text, original, ...))
+[('alice', 0, 1.0), ('bob', 9, 0.65), ...]
+"""
+import heapq
+
+from .store import map_columns, write_columns
+from . import vectorized
+
+WORD_BYTES = 8
+
+
+class PayloadRegistry:
+    """
+    :param bits: The number of bits of every payload.
+    """
+    def __init__(self, bits):
+        self.bits = bits
+        self.row_bytes = -(-bits // (8 * WORD_BYTES)) * WORD_BYTES
+        # payloads are left-aligned in their rows
+        self.padding = 8 * self.row_bytes - bits
+        self.recipients = []
+        self.rows = bytearray()
+        self._matrix = None
+
+    def __len__(self):
+        return len(self.recipients)
+
+    def add(self, recipient, payload):
+        """
+        :param recipient: Identifies the recipient, for example by name.
+        :param payload: The bits issued to the recipient, as a string of
+                        '0' and '1'.
+        """
+        if len(payload) != self.bits or set(payload) - {'0', '1'}:
+            raise ValueError('A payload must be {} bits of 0 and 1.'.format(
+                self.bits))
+        self.recipients.append(recipient)
+        self.rows += self.pack(int(payload, 2))
+        self._matrix = None
+
+    def pack(self, value):
+        return (value << self.padding).to_bytes(self.row_bytes, 'big')
+
+    def match(self, decoded_bits, limit=10):
+        """
+        Returns the recipients whose payloads are closest to the decoded
+        bits, closest first, as (recipient, distance, confidence) tuples.
+        Bits decoded as '?' are ignored.  The confidence is the fraction of
+        recovered bits that agree with the payload; an unrelated payload
+        agrees with about half of them.
+
+        :param decoded_bits: The bits decoded from a text, as returned by
+                             the decode functions with message_bits set to
+                             the number of bits of the payloads, as a
+                             string or a bits.Bits.
+        :param limit: The number of recipients to return.
+        """
+        decoded_bits = str(decoded_bits)
+        if len(decoded_bits) != self.bits:
+            raise ValueError('Expected {} decoded bits, got {}.'.format(
+                self.bits, len(decoded_bits)))
+        mask = int(''.join('0' if bit == '?' else '1'
+                           for bit in decoded_bits) or '0', 2)
+        value = int(decoded_bits.replace('?', '0') or '0', 2)
+        known = bin(mask).count('1')
+
+        if vectorized.numpy is not None:
+            ranked = self.nearest_vectorized(value, mask, limit)
+        else:
+            ranked = self.nearest(value, mask, limit)
+        return [(self.recipients[index], distance,
+                 1 - distance / known if known else 0.0)
+                for distance, index in ranked]
+
+    def nearest(self, value, mask, limit):
+        """ the (distance, index) of the closest rows, one row at a time """
+        value = int.from_bytes(self.pack(value), 'big')
+        mask = int.from_bytes(self.pack(mask), 'big')
+        rows = self.rows
+        row_bytes = self.row_bytes
+        distances = ((bit_count((int.from_bytes(
+                          rows[start:start + row_bytes], 'big') ^ value) &
+                                mask), index)
+                     for index, start in enumerate(range(0, len(rows),
+                                                         row_bytes)))
+        return heapq.nsmallest(limit, distances)
+
+    def nearest_vectorized(self, value, mask, limit):
+        """ the (distance, index) of the closest rows, all rows at once """
+        numpy = vectorized.numpy
+        matrix = self.matrix()
+        value = numpy.frombuffer(self.pack(value), dtype=numpy.uint64)
+        mask = numpy.frombuffer(self.pack(mask), dtype=numpy.uint64)
+        differences = numpy.bitwise_xor(matrix, value)
+        numpy.bitwise_and(differences, mask, out=differences)
+        # distances are at most self.bits, and small types are faster to
+        # sum and select from
+        dtype = numpy.uint16 if self.bits < 2**16 else numpy.uint32
+        distances = popcount(differences).sum(axis=1, dtype=dtype)
+
+        if 0 < limit < len(distances):
+            cutoff = numpy.partition(distances, limit - 1)[limit - 1]
+            # every row as close as the limit-th closest is a candidate, so
+            # that ties are broken by order of addition as in nearest
+            closest = numpy.flatnonzero(distances <= cutoff)
+        else:
+            closest = numpy.arange(len(distances))
+        order = numpy.lexsort((closest, distances[closest]))[:limit]
+        return [(int(distances[closest[i]]), int(closest[i]))
+                for i in order]
+
+    def matrix(self):
+        """ the rows as a NumPy array of words, rebuilt after an add """
+        if self._matrix is None:
+            numpy = vectorized.numpy
+            self._matrix = numpy.frombuffer(
+                bytes(self.rows), dtype=numpy.uint64).reshape(
+                    len(self), self.row_bytes // WORD_BYTES)
+        return self._matrix
+
+
+try:
+    bit_count = int.bit_count
+except AttributeError:  # before Python 3.10
+    def bit_count(value):
+        return bin(value).count('1')
+
+
+def popcount(words):
+    """ the number of bits set in every word of a NumPy array """
+    numpy = vectorized.numpy
+    if hasattr(numpy, 'bitwise_count'):
+        return numpy.bitwise_count(words)
+    table = numpy.array([bin(byte).count('1') for byte in range(256)],
+                        dtype=numpy.uint8)
+    return table[words.view(numpy.uint8)].reshape(
+        words.shape + (WORD_BYTES,)).sum(axis=-1)
+
+
+def save_registry(registry, path):
+    """ writes a PayloadRegistry to a file, see the store module """
+    write_columns(path, {'kind': 'payloads', 'bits': registry.bits,
+                         'recipients': registry.recipients},
+                  [('rows', 'B', registry.rows)])
+
+
+def load_registry(path):
+    """
+    Loads a file written by save_registry.  The rows are copied out of the
+    mapped file, so that more payloads can be added.
+    """
+    header, column = map_columns(path, 'payloads')
+    registry = PayloadRegistry(header['bits'])
+    registry.recipients = header['recipients']
+    registry.rows = bytearray(column('rows'))
+    return registry
@@ -0,0 +1,104 @@
+"""
+A 'plan' is a cover text together with its branchpoints.
+
+Finding the branchpoints of a text is by far the most expensive part of
+encoding and decoding, and it only depends on the original text.  When many
+messages are encoded into (or decoded from) the same text, prepare the text
+once and reuse the plan:
+
+>> plan = steganos.prepare(original_text)
+>> encoded_text = plan.encode('101')
+>> plan.decode_full_text(encoded_text, message_bits=3)
+'101'
+"""
+from .alignment import AlignmentIndex
+from .branchpoints import DEFAULT_ANALYZER, GREEDY, ChangeIndex
+from .compact import CompactBranchpoints
+from . import steganos_decode
+from . import steganos_encode
+
+
+class Plan:
+    def __init__(self, text, branchpoints=None, strategy=GREEDY,
+                 processes=None, compact=False, analyzer=None):
+        self.text = text
+        self.strategy = strategy
+        # identifies the rules the branchpoints were found with, or None if
+        # they were given
+        self.ruleset = None
+        if branchpoints is None:
+            analyzer = analyzer or DEFAULT_ANALYZER
+            branchpoints = analyzer.get_all_branchpoints(text, strategy,
+                                                         processes)
+            self.ruleset = analyzer.ruleset
+        if compact and not isinstance(branchpoints, CompactBranchpoints):
+            branchpoints = CompactBranchpoints(branchpoints)
+        self.branchpoints = branchpoints
+        self._alignment_index = None
+        self._change_index = None
+
+    @property
+    def change_index(self):
+        """ the sorted changes of the branchpoints, built on first use """
+        if self._change_index is None:
+            self._change_index = ChangeIndex(self.branchpoints)
+        return self._change_index
+
+    @property
+    def alignment_index(self):
+        """ built the first time a partial text is decoded without indices """
+        if self._alignment_index is None:
+            self._alignment_index = AlignmentIndex(self.text)
+        return self._alignment_index
+
+    def bit_capacity(self):
+        return steganos_encode.bit_capacity(self.text, self.branchpoints)
+
+    def encode(self, bits):
+        return steganos_encode.encode(bits, self.text, self.branchpoints,
+                                      self.change_index)
+
+    def encode_many(self, messages, processes=None):
+        return steganos_encode.encode_many(messages, self.text, processes,
+                                           self.branchpoints,
+                                           self.change_index)
+
+    def decode_full_text(self, encoded_text, message_bits=None,
+                         packed=False):
+        return steganos_decode.decode_full_text(encoded_text, self.text,
+                                                message_bits,
+                                                self.branchpoints,
+                                                self.change_index, packed)
+
+    def decode_partial_text(self, encoded_text, encoded_range=None,
+                            message_bits=None, packed=False):
+        alignment_index = None if encoded_range else self.alignment_index
+        return steganos_decode.decode_partial_text(encoded_text, self.text,
+                                                   encoded_range,
+                                                   message_bits,
+                                                   self.branchpoints,
+                                                   alignment_index,
+                                                   self.change_index, packed)
+
+
+def prepare(text, strategy=GREEDY, processes=None, compact=False,
+            analyzer=None):
+    """
+    Finds the branchpoints of a text once so that they can be reused by
+    any number of encode and decode calls.
+
+    :param text: The original text.
+    :param strategy: How to choose among intersecting branchpoints: 'greedy'
+                     (the default) or 'optimal', which can find more
+                     branchpoints but takes longer.  A text encoded with one
+                     strategy must be decoded with the same strategy.
+    :param processes (Optional): If given, large texts are analyzed by a pool
+                     of this many processes.
+    :param compact: If True, the branchpoints are kept in a
+                    CompactBranchpoints, which takes much less memory.
+    :param analyzer (Optional): An Analyzer with the rules to find
+                    branchpoints with, instead of the default rules.
+    :return: A Plan for the text.
+    """
+    return Plan(text, strategy=strategy, processes=processes,
+                compact=compact, analyzer=analyzer)
@@ -0,0 +1,292 @@
+"""
+Finds the branchpoints of a text that is given piece by piece.
+
+The text is split into segments at 'safe' indices: indices that are not
+inside an unchangeable area, not inside a contraction, and at which every
+regular expression used to find branchpoints starts afresh.  Most of the work
+of get_all_branchpoints (finding candidate branchpoints, dropping the parts
+of them in unchangeable areas and removing redundant characters) only depends
+on the segment and the characters around it, so it is done one segment at a
+time.  Ordering the branchpoints and choosing mutually exclusive ones is then
+done over the results of all segments, which gives exactly the branchpoints
+that get_all_branchpoints finds for the whole text.
+
+Since segments are analyzed independently, find_branchpoints_in_parallel
+analyzes the segments of a large text in a pool of processes.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .branchpoints import (DEFAULT_ANALYZER, GREEDY, AreaIndex,
+                           changeable_part, code_re, find_unchangeable_areas,
+                           get_contraction_branchpoints, markdown_re,
+                           mutually_exclusive_branchpoints,
+                           remove_redundant_characters_from_change,
+                           removed_branchpoints, sort_branchpoints, url_re)
+from .compact import CompactBranchpoints
+
+# number of characters after a segment that the rules may look at.  It must
+# be longer than any contraction.
+MARGIN = 16
+
+# smallest piece of text worth sending to another process
+MIN_SHARD_SIZE = 2**16
+
+# the most characters analyzed at a time when gathering a
+# CompactBranchpoints, since the lists of changes found in a segment take
+# many times its size
+COMPACT_CHUNK_SIZE = 2**14
+
+
+def find_branchpoints_in_chunks(chunks, strategy=GREEDY, compact=False):
+    """
+    Returns the same branchpoints as
+    get_all_branchpoints(''.join(chunks), strategy), without ever holding
+    more than a few chunks of the text at a time.
+
+    :param compact: Whether to gather the branchpoints of the segments in a
+                    CompactBranchpoints and return one, so that those of a
+                    large text are never held as lists of changes.
+    """
+    if compact:
+        chunks = split_chunks(chunks, COMPACT_CHUNK_SIZE)
+    return merge_segments((analyze_segment(*segment)
+                           for segment in iter_segments(chunks)), strategy,
+                          compact)
+
+
+def find_branchpoints_in_parallel(text, processes=None, strategy=GREEDY,
+                                  shard_size=None):
+    """
+    Returns the same branchpoints as get_all_branchpoints(text, strategy),
+    analyzing segments of the text in a pool of processes.  Only splitting
+    the text and choosing mutually exclusive branchpoints is done in this
+    process.
+
+    :param processes (Optional): The number of processes in the pool.
+                     Defaults to the number of processors.
+    :param shard_size (Optional): The approximate number of characters
+                     analyzed by a process at a time.  Defaults to a size
+                     that gives every process a few segments.
+    """
+    if shard_size is None:
+        shard_size = max(len(text) // (4 * (processes or os.cpu_count() or 1)),
+                         MIN_SHARD_SIZE)
+    chunks = (text[index:index + shard_size]
+              for index in range(0, len(text), shard_size))
+    with ProcessPoolExecutor(processes) as executor:
+        results = executor.map(analyze_shard, iter_segments(chunks))
+        return merge_segments(results, strategy)
+
+
+def analyze_shard(segment):
+    return analyze_segment(*segment)
+
+
+def split_chunks(chunks, size):
+    """ splits chunks longer than size into pieces of that size """
+    for chunk in chunks:
+        for index in range(0, len(chunk), size):
+            yield chunk[index:index + size]
+
+
+def iter_segments(chunks):
+    """
+    Splits a text given as an iterable of chunks into segments.
+
+    Yields tuples of (offset, before, segment, after, unchangeable_areas),
+    where offset is the index of the segment in the text, before is the
+    character preceding it, after is the text following it (up to MARGIN
+    characters) and unchangeable_areas are the unchangeable areas of the
+    segment, relative to its start.
+
+    The text after a code fence or a bracket that has not been closed may
+    still turn out to be unchangeable, so it is held (and yielded as a single
+    segment) until the fence or bracket is closed or the text ends.
+    """
+    pieces = []
+    length = 0
+    offset = 0
+    before = ''
+    chunks = iter(chunks)
+    exhausted = False
+    # the length the window has to reach before looking for a cut again.
+    # A window that cannot be cut yet (after a code fence or a bracket that
+    # has not been closed, say) is only scanned again once it has doubled,
+    # so it is scanned a number of times logarithmic in its length rather
+    # than once per chunk.
+    retry_length = 0
+    while not exhausted:
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+        else:
+            pieces.append(chunk)
+            length += len(chunk)
+
+        if not exhausted and length < retry_length:
+            continue
+        window = ''.join(pieces)
+        if exhausted:
+            cut = len(window)
+            areas = find_unchangeable_areas(window)
+        else:
+            cut, areas = safe_cut(window)
+
+        if cut > 0:
+            yield (offset, before, window[:cut], window[cut:cut + MARGIN],
+                   areas)
+            before = window[cut - 1]
+            offset += cut
+            window = window[cut:]
+            retry_length = 0
+        else:
+            retry_length = 2 * len(window)
+        pieces = [window]
+        length = len(window)
+
+
+def safe_cut(window):
+    """
+    Returns the largest safe index of the window at which it can be split,
+    or 0 if there is none yet, along with the unchangeable areas before it.
+    The window must start at a safe index of the text.
+    """
+    areas = find_unchangeable_areas(window)
+    contractions = [branchpoint[0]
+                    for branchpoint in get_contraction_branchpoints(window)]
+    cut = min(len(window) - MARGIN, unresolved_index(window))
+
+    moved = True
+    while moved and cut > 0:
+        moved = False
+        for start, end, *_ in areas + contractions:
+            if start < cut < end:
+                cut = start
+                moved = True
+
+    return max(cut, 0), [area for area in areas if area[1] <= cut]
+
+
+def unresolved_index(text):
+    """
+    Returns the first index of the text from which a match of the
+    expressions for unchangeable areas could depend on the text that follows
+    it.  Before this index, the areas found in this text are the areas that
+    would be found in any text that starts with it.
+    """
+    index = len(text)
+
+    # a code fence that has not been closed yet
+    code_end = max([m.end() for m in code_re.finditer(text)], default=0)
+    fence = text.find('```', code_end)
+    if fence != -1:
+        index = min(index, fence)
+    for length in (2, 1):
+        if text.endswith('`' * length, code_end):
+            index = min(index, len(text) - length)
+
+    # a url that runs up to the end of the text, or the beginning of one
+    for match in url_re.finditer(text):
+        if match.end() == len(text):
+            index = min(index, match.start())
+    for length in range(len('https://'), 0, -1):
+        tail = text[-length:]
+        if 'https://'.startswith(tail) or 'http://'.startswith(tail):
+            index = min(index, len(text) - length)
+            break
+
+    # a markdown link that has not been closed yet
+    markdown_end = max([m.end() for m in markdown_re.finditer(text)],
+                       default=0)
+    bracket = text.find('[', markdown_end)
+    while bracket != -1 and bracket < index:
+        closing = text.find(']', bracket + 1)
+        if (closing == -1 or closing == len(text) - 1 or
+                (text[closing + 1] == '(' and
+                 text.find(')', closing + 2) == -1)):
+            if bracket > markdown_end and text[bracket - 1] == '!':
+                bracket -= 1
+            index = min(index, bracket)
+            break
+        bracket = text.find('[', bracket + 1)
+
+    return index
+
+
+def analyze_segment(offset, before, segment, after, unchangeable_areas):
+    """
+    Finds the branchpoints that start in a segment of a text, with the rules
+    of the default analyzer.
+
+    Returns a tuple of the local branchpoints, sorted as in
+    get_all_branchpoints, and a list of the changes of each global rule, in
+    the order of the analyzer's global rules.  The indices of all changes are
+    indices of the whole text.  Unchangeable parts and redundant characters
+    have already been removed.
+    """
+    text = before + segment + after
+    first = len(before)
+    last = first + len(segment)
+    shift = offset - first
+
+    analyzer = DEFAULT_ANALYZER
+    candidates = analyzer.scan(text)
+    if 'contraction' in candidates:
+        # contractions are matched from the start of the segment, where
+        # matching starts afresh
+        candidates['contraction'] = [
+            [(start + first, end + first, string)]
+            for [(start, end, string)]
+            in analyzer.contraction_trie.find(segment + after)]
+    local_branchpoints = sort_branchpoints(
+        [bp for rule in analyzer.local_rules for bp in candidates[rule]])
+
+    areas = AreaIndex([(start + first, end + first)
+                       for start, end in unchangeable_areas])
+
+    # only the last segment is followed by nothing, and it also holds the
+    # changes that insert at the end of the text
+    if not after:
+        last += 1
+
+    def finish(changes):
+        changes = [change for change in changes if first <= change[0] < last]
+        changes = changeable_part(changes, areas)
+        changes = [remove_redundant_characters_from_change(text, change)
+                   for change in changes]
+        return [(start + shift, end + shift, string)
+                for start, end, string in changes]
+
+    local_branchpoints = [finish(branchpoint)
+                          for branchpoint in local_branchpoints]
+    return ([branchpoint for branchpoint in local_branchpoints if branchpoint],
+            [finish(candidates[rule]) for rule in analyzer.global_rules])
+
+
+def merge_segments(results, strategy=GREEDY, compact=False):
+    """
+    Combines the results of analyze_segment for every segment of a text, in
+    order, into the branchpoints of the whole text.
+
+    :param compact: Whether to return a CompactBranchpoints.
+    """
+    local_branchpoints = CompactBranchpoints() if compact else []
+    global_changes = [[] for _ in DEFAULT_ANALYZER.global_rules]
+    for segment_branchpoints, segment_globals in results:
+        local_branchpoints.extend(segment_branchpoints)
+        for changes, segment_changes in zip(global_changes, segment_globals):
+            changes.extend(segment_changes)
+
+    global_branchpoints = [bp for bp in global_changes if bp]
+    if not compact:
+        return mutually_exclusive_branchpoints(global_branchpoints +
+                                               local_branchpoints, strategy)
+
+    candidates = CompactBranchpoints(global_branchpoints)
+    candidates.extend(local_branchpoints)
+    del local_branchpoints
+    to_remove = removed_branchpoints(candidates, strategy)
+    return CompactBranchpoints(branchpoint
+                               for index, branchpoint in enumerate(candidates)
+                               if index not in to_remove)
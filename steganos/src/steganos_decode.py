@@ -7,10 +7,21 @@ the change, and the third element is the string that will replace it.
 A 'branchpoint' is a decision about the text that can be used to encode
 a single bit.  Each branch point is represented by a list of 'changes'.
 """
-from .branchpoints import get_all_branchpoints
+from bisect import bisect_left
+from itertools import chain, islice
 
+from .alignment import (AlignmentIndex, candidate_starts,
+                        strip_inserted_characters)
+from .bits import Bits, bytes_to_string, string_to_bytes
+from .branchpoints import ChangeIndex, get_all_branchpoints
 
-def decode_full_text(encoded_text, original_text, message_bits=None):
+# pieces of encoded text shorter than this are placed at the earliest index
+# of the original text they fit, see get_indices
+SHORT_PIECE = 32
+
+
+def decode_full_text(encoded_text, original_text, message_bits=None,
+                     branchpoints=None, change_index=None, packed=False):
     """
     Decodes bits from encoded text. Use this function if you have
     the full encoded text, otherwise use decode_partial_text function.
@@ -20,16 +31,25 @@ def decode_full_text(encoded_text, original_text, message_bits=None):
     :param message_bits: number of bits in message. If this isn't provided, the
                          number decoded bits will be the full capacity of the
                          text.
+    :param branchpoints (Optional): The branchpoints of the original text, as
+                         returned by get_all_branchpoints. If this isn't
+                         provided, they will be computed.
+    :param change_index (Optional): A branchpoints.ChangeIndex of the
+                         branchpoints, which is built if it isn't provided.
+    :param packed: If True, the bits are returned as a bits.Bits.
     :return: The bits decoded from the text. Unretrievable bits are
              returned as question marks.
     """
     encoded_range = (0, len(original_text))
     return decode_partial_text(encoded_text, original_text, encoded_range,
-                               message_bits)
+                               message_bits, branchpoints,
+                               change_index=change_index, packed=packed)
 
 
 def decode_partial_text(encoded_text, original_text, encoded_range=None,
-                        message_bits=None):
+                        message_bits=None, branchpoints=None,
+                        alignment_index=None, change_index=None,
+                        packed=False, window_index=None):
     """
     Decodes bits from encoded text. Use this function if you do not have
     the full partial text.
@@ -44,86 +64,195 @@ def decode_partial_text(encoded_text, original_text, encoded_range=None,
     :param message_bits: number of bits in message. If this isn't provided, the
                          number decoded bits will be the full capacity of the
                          text.
+    :param branchpoints (Optional): The branchpoints of the original text, as
+                         returned by get_all_branchpoints. If this isn't
+                         provided, they will be computed.
+    :param alignment_index (Optional): An alignment.AlignmentIndex of the
+                            original text, used to infer encoded_range.
+    :param change_index (Optional): A branchpoints.ChangeIndex of the
+                         branchpoints, which is built if it isn't provided.
+    :param packed: If True, the bits are returned as a bits.Bits, in which
+                   unretrievable bits are unknown.
+    :param window_index (Optional): A window.WindowIndex of the original
+                         text.  If it is given along with encoded_range (and
+                         neither branchpoints nor change_index are), only
+                         the piece of the original text in encoded_range is
+                         analyzed.
     :return: The bits decoded from the text. Unretrievable bits are
              returned as question marks.
     """
-    branchpoints = get_all_branchpoints(original_text)
-    message_bits = message_bits or len(branchpoints)
-    start, end = encoded_range or get_indices(encoded_text, original_text,
-                                              branchpoints)
+    if (window_index is not None and encoded_range is not None and
+            branchpoints is None and change_index is None):
+        start, end = encoded_range
+        capacity = window_index.capacity
+        changes = window_index.relevant_changes(original_text, start, end)
+    else:
+        if change_index is None:
+            if branchpoints is None:
+                branchpoints = get_all_branchpoints(original_text)
+            change_index = ChangeIndex(branchpoints)
+        start, end = encoded_range or get_indices(
+            encoded_text, original_text, branchpoints, alignment_index,
+            change_index)
+        capacity = change_index.capacity
+        changes = get_relevant_changes(change_index, start, end)
+    message_bits = message_bits or capacity
     original_text = original_text[start:end]
-    branchpoints = reindex_branchpoints(branchpoints, start)
-    changes = get_relevant_changes(branchpoints, start, end)
 
+    # the texts are walked together with a running offset between them, so
+    # that decoding takes time linear in the length of the text
+    decoded = decode_changes(changes, StringCursor(encoded_text),
+                             StringCursor(original_text), message_bits)
+    if packed:
+        return packed_bits(decoded, message_bits)
     bits = ['?'] * message_bits
-    for change in changes:
-        if encoded_text[:change[0]] != original_text[:change[0]]:
-            raise ValueError('Cannot extract bits from encoded text. '
-                             'It does not match the original text.')
-
-        index = branchpoints.index(next(bp for bp in branchpoints
-                                        if change in bp))
-        bindex = index % message_bits
-        if bits[bindex] == '?':
-            bits[bindex] = ('1'
-                            if change_was_made(encoded_text, original_text,
-                                               change)
-                            else '0')
-        if bits[bindex] == '1':
-            encoded_text = undo_change(encoded_text, original_text, change)
-
+    for bindex, bit in decoded:
+        bits[bindex] = bit
     return ''.join(bits)
 
 
-def get_relevant_changes(branchpoints, start, end):
+def packed_bits(decoded, message_bits):
+    """
+    Collects the (bit index, bit) pairs yielded by decode_changes in a
+    bits.Bits, setting the bits that were decoded in its known bytes.
+    """
+    data = bytearray(-(-message_bits // 8))
+    known = bytearray(len(data))
+    count = 0
+    for bindex, bit in decoded:
+        mask = 0x80 >> (bindex & 7)
+        known[bindex >> 3] |= mask
+        if bit == '1':
+            data[bindex >> 3] |= mask
+        count += 1
+    # decode_changes yields every bit at most once
+    return Bits(data, message_bits, None if count == message_bits else known)
+
+
+def get_relevant_changes(change_index, start, end):
+    """
+    Returns the changes that lie entirely within the piece of the original
+    text from start to end, with indices relative to start, each along with
+    the index of its branchpoint.
+    """
     index = end - start
-
-    def change_is_relevant(change):
-        return (change[0] >= 0 and change[0] < index and change[1] > 0 and
-                change[1] <= index)
-    changes = sum(branchpoints, [])
-    changes = [change for change in changes if change_is_relevant(change)]
-    changes.sort()
-    return changes
-
-
-def reindex_branchpoints(branchpoints, start):
-    return [reindex_changes(bp, start) for bp in branchpoints]
-
-
-def reindex_changes(changes, start):
-    return [(change[0] - start, change[1] - start, change[2])
-            for change in changes]
-
-
-def get_indices(encoded_text, original_text, branchpoints):
-    changes = sum(branchpoints, [])
-    changes.sort()
-
-    for start in range(len(original_text)):
-        partial_text = original_text[start:]
-        partial_changes = reindex_changes(changes, start)
-        partial_changes = [change for change in partial_changes
-                           if change[0] >= 0]
+    changes = change_index.changes
+    indices = change_index.indices
+    relevant = []
+    for position in change_index.starting_between(start, end):
+        change_start, change_end, change_string = changes[position]
+        if 0 < change_end - start <= index:
+            relevant.append(((change_start - start, change_end - start,
+                              change_string), indices[position]))
+    return relevant
+
+
+def get_indices(encoded_text, original_text, branchpoints,
+                alignment_index=None, change_index=None):
+    """
+    Infers the start and end indices of the piece of the original text that
+    the encoded text corresponds to.
+
+    Candidate start indices are found with an alignment index over the
+    original text and verified one by one.  If none of them fits, the piece
+    does not come from the original text, unless it is too short to be sure
+    to contain a gram of the index or no gram of it was found at all; only
+    then is every start index of the original text tried.
+
+    A piece that fits the original text at more than one index is placed at
+    the first candidate that fits, which for a long piece may not be the
+    earliest index that fits.  Short pieces are the likeliest to fit more
+    than once, so for pieces shorter than SHORT_PIECE the indices before
+    that candidate are tried as well, and the earliest that fits is taken.
+
+    :param alignment_index (Optional): An alignment.AlignmentIndex of the
+                            original text.  If this isn't provided, it will
+                            be built.
+    :param change_index (Optional): A branchpoints.ChangeIndex of the
+                         branchpoints.
+    """
+    if change_index is None:
+        change_index = ChangeIndex(branchpoints)
+    changes = change_index.changes
+    change_starts = change_index.starts
+
+    if alignment_index is None:
+        alignment_index = AlignmentIndex(original_text)
+    candidates = candidate_starts(encoded_text, alignment_index, changes,
+                                  change_starts)
+
+    # a piece that holds a verbatim stretch of gram + step - 1 characters of
+    # the original always has its start among the candidates, so every start
+    # index of the original text is only tried for shorter pieces, and for
+    # pieces so densely changed that none of their grams is in the index
+    stripped_length = len(strip_inserted_characters(encoded_text))
+    if (not candidates or
+            stripped_length < alignment_index.gram + alignment_index.step - 1):
+        candidates = chain(candidates, range(len(original_text)))
+    for start in candidates:
+        indices = match_at(encoded_text, original_text, changes,
+                           change_starts, start)
+        if indices:
+            break
+    else:
+        raise ValueError('Cannot infer indices of encoded text. '
+                         'It does not match the original text.')
+
+    if len(encoded_text) < SHORT_PIECE:
+        for start in range(indices[0]):
+            earlier = match_at(encoded_text, original_text, changes,
+                               change_starts, start)
+            if earlier:
+                return earlier
+    return indices
+
+
+def match_at(encoded_text, original_text, changes, change_starts, start):
+    """
+    Checks whether the encoded text corresponds to the original text
+    starting at the given index, by undoing the changes that were made to
+    it.  Returns the indices of the corresponding piece of the original text
+    if it does, otherwise None.
+    """
+    first_change = bisect_left(change_starts, start)
+
+    # Only a piece of the original text a little longer than the encoded text
+    # takes part in the comparisons below, unless undoing changes makes the
+    # reverted text grow past it, in which case the check is repeated with the
+    # rest of the original text.
+    for length in (2 * len(encoded_text) + 64, None):
+        if length is None or start + length >= len(original_text):
+            partial_text = original_text[start:]
+            truncated = False
+        else:
+            partial_text = original_text[start:start + length]
+            truncated = True
 
         # in the case that there are no changes
         if encoded_text == partial_text[:len(encoded_text)]:
             return (start, start + len(encoded_text))
 
         reverted_text = encoded_text
-        for change in partial_changes:
-            if reverted_text[:change[0]] != partial_text[:change[0]]:
+        for change in islice(changes, first_change, None):
+            change = (change[0] - start, change[1] - start, change[2])
+            if truncated and max(change[1], len(reverted_text)) >= length:
                 break
 
+            if reverted_text[:change[0]] != partial_text[:change[0]]:
+                return None
+
             if change_was_made(reverted_text, partial_text, change):
                 reverted_text = undo_change(reverted_text, partial_text,
                                             change)
 
+            if truncated and len(reverted_text) >= length:
+                break
+
             if reverted_text == partial_text[:len(reverted_text)]:
                 return (start, start + len(reverted_text))
-
-    raise ValueError('Cannot infer indices of encoded text. '
-                     'It does not match the original text.')
+        else:
+            return None
+    return None
 
 
 def undo_change(encoded_text, original_text, change):
@@ -164,17 +293,157 @@ def change_was_made(encoded_text, original_text, change):
     return encoded_text[start:end_change] == change_string[:end_change - start]
 
 
-def binary_to_bytes(binary):
-    return bytes(chunk_binary_str_to_bytes(binary))
+class TextCursor:
+    """
+    Gives access by index to a text that is read from an iterable of chunks,
+    holding only the part of it that has been read but not yet discarded.
+    """
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = ''
+        self.offset = 0
+        self.exhausted = False
+
+    def fill(self, end):
+        pieces = [self.buffer]
+        available = self.offset + len(self.buffer)
+        while available < end and not self.exhausted:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.exhausted = True
+            else:
+                pieces.append(chunk)
+                available += len(chunk)
+        if len(pieces) > 1:
+            self.buffer = ''.join(pieces)
+
+    def length_up_to(self, length):
+        """ the length of the text, or length if the text is longer """
+        self.fill(length)
+        return min(self.offset + len(self.buffer), length)
+
+    def slice(self, start, end):
+        self.fill(end)
+        return self.buffer[start - self.offset:max(end - self.offset, 0)]
+
+    def discard(self, end):
+        """ allows the text before end to be dropped """
+        if end - self.offset > max(len(self.buffer) // 2, 4096):
+            self.buffer = self.buffer[end - self.offset:]
+            self.offset = end
+
+
+class StringCursor:
+    """ a TextCursor over a text that is already in memory """
+    def __init__(self, text):
+        self.text = text
+        self.length = len(text)
+
+    def length_up_to(self, length):
+        return min(self.length, length)
+
+    def slice(self, start, end):
+        return self.text[start:max(end, 0)]
+
+    def discard(self, end):
+        pass
+
+
+def decode_changes(changes, encoded, original, message_bits):
+    """
+    Decodes bits by walking an encoded text and the original text together.
+
+    Rather than undoing the changes that were made to the encoded text, this
+    keeps track of how far the two texts are known to agree (the 'frontier')
+    and of the difference between an index of the original text and the
+    corresponding index of the encoded text past the frontier ('delta').
+    Every change is checked in place, so each character of either text is
+    only compared once.  The bits decoded are those that decode_partial_text
+    finds.
+
+    :param changes: An iterable of (change, branchpoint index) pairs, sorted
+                    by change, with indices relative to the start of the
+                    original text.
+    :param encoded: A TextCursor (or StringCursor) over the encoded text.
+    :param original: A TextCursor (or StringCursor) over the original text.
+    :param message_bits: number of bits in message.
+    :return: An iterator of (bit index, bit) pairs, yielded as soon as each
+             bit has been decoded.
+    """
+    bits = ['?'] * message_bits
+    frontier = 0
+    delta = 0
+
+    def reverted(start, end):
+        """ a slice of the encoded text with all changes so far undone """
+        head = original.slice(start, min(end, frontier))
+        tail = encoded.slice(max(start, frontier) + delta, end + delta)
+        return head + tail
+
+    def reverted_length_up_to(length):
+        return encoded.length_up_to(length + delta) - delta
+
+    encoded_slice = encoded.slice
+    original_slice = original.slice
+    encoded_length_up_to = encoded.length_up_to
+    original_length_up_to = original.length_up_to
+    for (start, end, change_string), index in changes:
+        # only changes entirely within the original text are relevant
+        last = end if end > start else start + 1
+        if end <= 0 or original_length_up_to(last) < last:
+            continue
+
+        if start > frontier:
+            if (encoded_slice(frontier + delta, start + delta) !=
+                    original_slice(frontier, start)):
+                raise ValueError('Cannot extract bits from encoded text. '
+                                 'It does not match the original text.')
+            frontier = start
+
+        # encoded text starts midway through a change
+        midway = None
+        if start == 0:
+            for length in range(len(change_string)):
+                if change_string[-1 * length:] == reverted(0, length):
+                    midway = length
+                    break
 
+        bindex = index % message_bits
+        if bits[bindex] == '?':
+            if midway is not None:
+                bits[bindex] = '1'
+            else:
+                end_change = start + len(change_string)
+                end_change = min(end_change,
+                                 encoded_length_up_to(end_change + delta) -
+                                 delta,
+                                 original_length_up_to(end_change))
+                # past the frontier the reverted text is the encoded text
+                made = (encoded_slice(start + delta, end_change + delta)
+                        if start == frontier else
+                        reverted(start, end_change))
+                bits[bindex] = ('1' if made ==
+                                change_string[:end_change - start] else '0')
+            yield bindex, bits[bindex]
 
-def bytes_to_binary(message):
-    return ''.join(bin(i)[2:].rjust(8, '0') for i in message)
+        if bits[bindex] == '1':
+            if (midway is not None and
+                    reverted_length_up_to(midway + 1) > midway):
+                remainder = midway
+            else:
+                remainder = start + len(change_string)
+            remainder = min(remainder,
+                            encoded_length_up_to(remainder + delta) - delta)
+            delta += remainder - end
+            frontier = end
 
+        original.discard(frontier)
+        encoded.discard(frontier + delta)
 
-def chunk_binary_str_to_bytes(binary):
-    for i in range(0, len(binary), 8):
-        try:
-            yield int(binary[i:i+8], base=2)
-        except ValueError:
-            yield ord('?')
+
+def binary_to_bytes(binary):
+    return string_to_bytes(binary)
+
+
+def bytes_to_binary(message):
+    return bytes_to_string(message)
@@ -1,14 +1,25 @@
-from .branchpoints import get_all_branchpoints
+from collections import deque
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 
+from .bits import bit_flags
+from .branchpoints import ChangeIndex, get_all_branchpoints
 
-def bit_capacity(text):
+# number of messages that encode_many hands to a worker process at a time
+BATCH_SIZE = 256
+
+
+def bit_capacity(text, branchpoints=None):
     """
     Returns the number of bits that can be encoded in a given string.
     """
-    return len(get_all_branchpoints(text))
+    if branchpoints is None:
+        branchpoints = get_all_branchpoints(text)
+    return len(branchpoints)
 
 
-def encode(bits, text):
+def encode(bits, text, branchpoints=None, change_index=None):
     """
     Encodes the provided bits into the given text.
 
@@ -29,25 +40,148 @@ def encode(bits, text):
     11
 
     :param bits: A string made up of '0' and '1' characters
-                 representing the bits to encode.
+                 representing the bits to encode, or the bits as bytes or
+                 a bits.Bits.
     :param text: The string within which to encode the bits.
+    :param branchpoints (Optional): The branchpoints of text, as returned by
+                         get_all_branchpoints.  Pass these in to avoid
+                         recomputing them when encoding many messages into
+                         the same text.
+    :param change_index (Optional): A branchpoints.ChangeIndex of the
+                         branchpoints, which is built if it isn't provided.
 
     :return: A string based on input text into which the
              given bits are encoded.
     :raises: ValueError if given too many bits to encode into text.
     """
-    branchpoints = get_all_branchpoints(text)
+    if change_index is None:
+        if branchpoints is None:
+            branchpoints = get_all_branchpoints(text)
+        change_index = ChangeIndex(branchpoints)
+
+    flags = bit_flags(bits)
+    check_capacity(flags, change_index.capacity)
+    # the bits are repeated to fill every branchpoint
+    changes = [change
+               for change, index in zip(change_index.changes,
+                                        change_index.indices)
+               if flags[index % len(flags)]]
+    return make_changes(text, changes)
+
 
-    if len(branchpoints) < len(bits):
+def encode_many(messages, text, processes=None, branchpoints=None,
+                change_index=None):
+    """
+    Encodes each of many messages into the same text.  This yields the same
+    strings as calling encode once per message, but the branchpoints of the
+    text are only found once and each encoded text is assembled from
+    precomputed pieces of the original.
+
+    Sample usage:
+
+    >> recipients = ['0001', '0010', '0011']
+    >> for encoded_text in steganos.encode_many(recipients, original_text):
+    ..     send(encoded_text)
+
+    :param messages: An iterable of messages, as accepted by encode.
+    :param text: The string within which to encode the bits.
+    :param processes (Optional): If given, the encoded texts are built by a
+                     pool of this many processes.
+    :param branchpoints (Optional): The branchpoints of text, as returned by
+                         get_all_branchpoints.
+    :param change_index (Optional): A branchpoints.ChangeIndex of the
+                         branchpoints.
+
+    :return: An iterator over the encoded texts, in the order of messages.
+    :raises: ValueError if given too many bits to encode into text.  The
+             text is analyzed, and the messages of a list or other sequence
+             are checked, before encode_many returns; a message of any
+             other iterable is checked when it is reached.
+    """
+    if change_index is None:
+        if branchpoints is None:
+            branchpoints = get_all_branchpoints(text)
+        change_index = ChangeIndex(branchpoints)
+    template = encoding_template(change_index, text)
+    if isinstance(messages, Sequence):
+        for bits in messages:
+            check_capacity(bit_flags(bits), change_index.capacity)
+    return iter_encoded_texts(template, messages, processes)
+
+
+def iter_encoded_texts(template, messages, processes):
+    """ the encoded texts of encode_many, built from an encoding_template """
+    if processes is None:
+        for bits in messages:
+            yield fill_template(template, bits)
+        return
+
+    # only a couple of batches per process are queued or waiting to be read
+    # at a time, so that neither the messages nor the encoded texts pile up
+    # in memory ahead of the caller
+    messages = iter(messages)
+    batches = iter(lambda: list(islice(messages, BATCH_SIZE)), [])
+    pending = deque()
+    with ProcessPoolExecutor(processes, initializer=set_worker_template,
+                             initargs=(template,)) as executor:
+        for batch in batches:
+            pending.append(executor.submit(fill_worker_batch, batch))
+            if len(pending) >= 2 * processes:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def encoding_template(change_index, text):
+    """
+    Splits text into the pieces that are never changed and, between them,
+    the pieces that might be.  Each changeable piece is stored along with its
+    replacement and the index of the branchpoint it belongs to.
+    """
+    unchanged = []
+    changeable = []
+    position = 0
+    for (start, end, change_string), index in zip(change_index.changes,
+                                                  change_index.indices):
+        unchanged.append(text[position:start])
+        changeable.append((index, text[start:end], change_string))
+        position = end
+    unchanged.append(text[position:])
+    return (change_index.capacity, unchanged, changeable)
+
+
+def fill_template(template, bits):
+    capacity, unchanged, changeable = template
+    flags = bit_flags(bits)
+    check_capacity(flags, capacity)
+
+    pieces = [None] * (2 * len(changeable) + 1)
+    pieces[::2] = unchanged
+    pieces[1::2] = [change_string
+                    if flags[index % len(flags)] else original_string
+                    for index, original_string, change_string in changeable]
+    return ''.join(pieces)
+
+
+_worker_template = None
+
+
+def set_worker_template(template):
+    global _worker_template
+    _worker_template = template
+
+
+def fill_worker_batch(batch):
+    return [fill_template(_worker_template, bits) for bits in batch]
+
+
+def check_capacity(bits, capacity):
+    if capacity < len(bits):
         raise ValueError(
             ('Attempting to encode {} bits into a text with a bit '
-             'capacity of {}.').format(len(bits), len(branchpoints))
+             'capacity of {}.').format(len(bits), capacity)
         )
 
-    repeated_bits = repeat(bits, len(branchpoints))
-    active_branchpoints = filter_by_bits(branchpoints, repeated_bits)
-    return execute_branchpoints(active_branchpoints, text)
-
 
 def repeat(xs, length):
     return xs * int(length / len(xs)) + xs[:length % len(xs)]
@@ -58,16 +192,21 @@ def filter_by_bits(xs, bits):
 
 
 def execute_branchpoints(branchpoints, text):
-    changes = sum(branchpoints, [])
+    changes = [change
+               for branchpoint in branchpoints for change in branchpoint]
     return make_changes(text, changes)
 
 
 def make_changes(text, changes):
     """ Assumes changes never overlap."""
-    # By executing the last changes first, we guarantee that
-    # the indices of each change remain accurate.
-    changes.sort(reverse=True)
-    for change in changes:
-        start, end, change_string = change
-        text = text[:start] + change_string + text[end:]
-    return text
+    # Walk the changes from the start of the text, collecting the untouched
+    # pieces of text between them and the strings that replace them, so
+    # that the result is assembled with a single join.
+    pieces = []
+    position = 0
+    for start, end, change_string in sorted(changes):
+        pieces.append(text[position:start])
+        pieces.append(change_string)
+        position = end
+    pieces.append(text[position:])
+    return ''.join(pieces)
@@ -0,0 +1,208 @@
+"""
+Saves the analysis of an original text to a file that can be loaded again
+without analyzing the text, by memory-mapping it.
+
+A file holds the text, its branchpoints (in the columns of a
+CompactBranchpoints), the sorted changes of its ChangeIndex and the sampled
+grams of its AlignmentIndex.  Loading it maps the file and wraps each column
+in a memoryview, so only the text itself is decoded; the other columns are
+read from the page cache as they are used, and processes that load the same
+file share its pages.
+
+>> steganos.save_plan(steganos.prepare(original_text), 'original.stg')
+>> plan = steganos.load_plan('original.stg')
+>> plan.decode_partial_text(encoded_text)
+
+The layout is:
+
+- the magic bytes, the format version and the length of the header, as
+  little-endian unsigned 32 bit integers,
+- the header, a JSON object describing what the file holds (a plan, or a
+  corpus index, see the corpus module) and giving the offset, array
+  typecode and length of every column,
+- the columns, each aligned to 8 bytes, in the byte order of the machine
+  that saved them.
+
+Files of another format version are rejected rather than misread.  A file
+saved on a machine of the other byte order is still loaded, but its columns
+are copied and swapped.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .alignment import AlignmentIndex
+from .branchpoints import ChangeIndex
+from .compact import CompactBranchpoints, CompactChanges
+from .plan import Plan
+
+MAGIC = b'STEGIDX\n'
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct('<8sII')
+COLUMN_ALIGNMENT = 8
+
+
+def save_plan(plan, path):
+    """
+    Writes the analysis of a plan to a file.  The file is written next to
+    path and then moved over it, so a process loading path never sees a
+    partly written file.
+
+    :param plan: A Plan, as returned by prepare.
+    :param path: The path of the file to write.
+    """
+    branchpoints = plan.branchpoints
+    if not isinstance(branchpoints, CompactBranchpoints):
+        branchpoints = CompactBranchpoints(branchpoints)
+    change_index = plan.change_index
+    alignment_index = plan.alignment_index
+    string_ids = branchpoints._string_ids
+
+    columns = [
+        ('text', 'B', plan.text.encode('utf8', 'surrogatepass')),
+        ('starts', 'q', branchpoints.starts),
+        ('ends', 'q', branchpoints.ends),
+        ('string_ids', 'I', branchpoints.string_ids),
+        ('offsets', 'q', branchpoints.offsets),
+        ('change_starts', 'q', array('q', (change[0] for change
+                                           in change_index.changes))),
+        ('change_ends', 'q', array('q', (change[1] for change
+                                         in change_index.changes))),
+        ('change_string_ids', 'I', array('I', (string_ids[change[2]]
+                                               for change
+                                               in change_index.changes))),
+        ('change_indices', 'q', array('q', change_index.indices)),
+        ('gram_keys', 'I', alignment_index.keys),
+        ('gram_positions', 'q', alignment_index.positions),
+    ]
+    header = {
+        'kind': 'plan',
+        'ruleset': plan.ruleset,
+        'strategy': plan.strategy,
+        'text_sha256': text_hash(plan.text),
+        'capacity': change_index.capacity,
+        'gram': alignment_index.gram,
+        'step': alignment_index.step,
+        'strings': branchpoints.strings,
+    }
+    write_columns(path, header, columns)
+
+
+def load_plan(path, text=None):
+    """
+    Loads a file written by save_plan as a Plan, without analyzing the text.
+
+    :param path: The path of the file.
+    :param text (Optional): The original text, if already at hand.  It must
+                            be the text the file was saved from; passing it
+                            saves decoding the copy in the file.
+    :return: A Plan whose branchpoints are a CompactBranchpoints over the
+             mapped file.
+    """
+    header, column = map_columns(path, 'plan')
+
+    if text is None:
+        text = str(column('text'), 'utf8', 'surrogatepass')
+    elif text_hash(text) != header['text_sha256']:
+        raise ValueError('The text is not the one {} was saved from.'.format(
+            path))
+
+    strings = header['strings']
+    branchpoints = CompactBranchpoints.from_columns(
+        column('starts'), column('ends'), column('string_ids'),
+        column('offsets'), strings)
+    change_starts = column('change_starts')
+    changes = CompactChanges(change_starts, column('change_ends'),
+                             column('change_string_ids'), strings)
+
+    plan = Plan(text, branchpoints, header['strategy'])
+    plan.ruleset = header['ruleset']
+    plan._change_index = ChangeIndex.from_sorted(
+        changes, column('change_indices'), header['capacity'], change_starts)
+    plan._alignment_index = AlignmentIndex.from_arrays(
+        text, column('gram_keys'), column('gram_positions'), header['gram'],
+        header['step'])
+    return plan
+
+
+def write_columns(path, header, columns):
+    """
+    Writes a header and named array columns in the layout described above,
+    through a temporary file that is then moved over path.
+
+    :param header: A JSON-serializable dictionary, whose 'kind' tells what
+                   the file holds.
+    :param columns: A list of (name, array typecode, column) triples, where a
+                    column is anything that supports the buffer protocol.
+    """
+    sections = {}
+    data = []
+    offset = 0
+    for name, typecode, column in columns:
+        column_bytes = memoryview(column).tobytes()
+        sections[name] = [offset, typecode, len(column)]
+        padding = -len(column_bytes) % COLUMN_ALIGNMENT
+        data.append(column_bytes + bytes(padding))
+        offset += len(column_bytes) + padding
+
+    header = dict(header, byteorder=sys.byteorder, sections=sections)
+    header_bytes = json.dumps(header).encode('utf8')
+
+    temporary_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary_path, 'wb') as index_file:
+        index_file.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION,
+                                       len(header_bytes)))
+        index_file.write(header_bytes)
+        index_file.write(bytes(-(PREAMBLE.size + len(header_bytes)) %
+                               COLUMN_ALIGNMENT))
+        for column_bytes in data:
+            index_file.write(column_bytes)
+    os.replace(temporary_path, path)
+
+
+def map_columns(path, kind):
+    """
+    Memory-maps a file written by write_columns.
+
+    :param kind: The kind of file expected.
+    :return: The header and a function of a column name that returns the
+             column as a memoryview over the mapped file.
+    """
+    with open(path, 'rb') as index_file:
+        mapped = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+
+    if len(mapped) < PREAMBLE.size:
+        raise ValueError('{} is not a steganos index.'.format(path))
+    magic, version, header_length = PREAMBLE.unpack_from(mapped)
+    if magic != MAGIC:
+        raise ValueError('{} is not a steganos index.'.format(path))
+    if version != FORMAT_VERSION:
+        raise ValueError('{} has format version {}, expected {}.'.format(
+            path, version, FORMAT_VERSION))
+    header_end = PREAMBLE.size + header_length
+    header = json.loads(bytes(view[PREAMBLE.size:header_end]).decode('utf8'))
+    if header.get('kind', 'plan') != kind:
+        raise ValueError('{} holds a {}, expected a {}.'.format(
+            path, header.get('kind', 'plan'), kind))
+    data_start = header_end + -header_end % COLUMN_ALIGNMENT
+
+    def column(name):
+        offset, typecode, length = header['sections'][name]
+        start = data_start + offset
+        end = start + length * array(typecode).itemsize
+        values = view[start:end].cast(typecode)
+        if header['byteorder'] != sys.byteorder and typecode != 'B':
+            values = array(typecode, values)
+            values.byteswap()
+        return values
+
+    return header, column
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf8', 'surrogatepass')).hexdigest()
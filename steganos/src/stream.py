@@ -0,0 +1,185 @@
+"""
+Encoding and decoding of texts that are too large to hold in memory as a
+single string.
+
+To encode, the text is read twice: once to find its branchpoints, segment
+by segment, and once more to write the encoded text as it is read.  Sources
+that cannot be read twice (for example generators of chunks) are copied to a
+temporary file during the first read, which stays in memory only while it is
+small.  The encoded text is exactly what steganos.encode returns for the
+whole text, so it can be decoded with any of the decode functions.
+
+To decode, the encoded text and the original text are read together, and
+bits are reported as soon as they have been decoded.
+"""
+import tempfile
+from contextlib import contextmanager
+
+from .bits import bit_flags
+from .branchpoints import ChangeIndex
+from .segments import find_branchpoints_in_chunks
+from .steganos_decode import TextCursor, decode_changes
+from .steganos_encode import check_capacity
+
+CHUNK_SIZE = 2**20
+SPOOL_SIZE = 2**24
+
+
+def encode_stream(bits, source, destination, chunk_size=CHUNK_SIZE):
+    """
+    Encodes the provided bits into a text read from source and writes the
+    encoded text to destination.
+
+    Sample usage:
+
+    >> with open('book.txt') as source, open('encoded.txt', 'w') as out:
+    ..     steganos.encode_stream('101', source, out)
+
+    :param bits: A string made up of '0' and '1' characters
+                 representing the bits to encode, or the bits as bytes or
+                 a bits.Bits.
+    :param source: A file-like object opened in text mode, or an iterable of
+                   strings, holding the text within which to encode the bits.
+    :param destination: A file-like object with a write method.
+    :param chunk_size: The number of characters read from source at a time.
+
+    :return: The number of branchpoints in the text, i.e. its bit capacity.
+    :raises: ValueError if given too many bits to encode into text.
+    """
+    with rereadable(source, chunk_size) as read_chunks:
+        # the changes are kept in the arrays of a CompactBranchpoints, and
+        # those to make are taken from them as the text is written
+        change_index = ChangeIndex(
+            find_branchpoints_in_chunks(read_chunks(), compact=True))
+        flags = bit_flags(bits)
+        check_capacity(flags, change_index.capacity)
+
+        changes = (change
+                   for change, index in zip(change_index.changes,
+                                            change_index.indices)
+                   if flags[index % len(flags)])
+        write_changes(read_chunks(), changes, destination)
+    return change_index.capacity
+
+
+def decode_stream(encoded_source, original_source, message_bits=None,
+                  branchpoints=None, chunk_size=CHUNK_SIZE):
+    """
+    Decodes bits from a complete encoded text, reading it and the original
+    text piece by piece.
+
+    Sample usage:
+
+    >> bits = ['?'] * 3
+    >> with open('encoded.txt') as encoded, open('book.txt') as original:
+    ..     for index, bit in steganos.decode_stream(encoded, original, 3):
+    ..         bits[index] = bit
+    >> ''.join(bits)
+    '101'
+
+    :param encoded_source: A file-like object opened in text mode, or an
+                           iterable of strings, holding the encoded text.
+    :param original_source: The same for the text before encoding.
+    :param message_bits: number of bits in message. If this isn't provided, the
+                         number decoded bits will be the full capacity of the
+                         text.
+    :param branchpoints (Optional): The branchpoints of the original text.
+                         If these aren't provided, the original text is read
+                         once more to find them, and they are kept in a
+                         CompactBranchpoints.
+    :param chunk_size: The number of characters read from a source at a time.
+    :return: An iterator of (bit index, bit) pairs, yielded as soon as each
+             bit has been decoded.  Bits that are never yielded could not be
+             retrieved.
+    :raises: ValueError if the encoded text does not match the original.
+    """
+    with rereadable(original_source, chunk_size) as read_chunks:
+        if branchpoints is None:
+            branchpoints = find_branchpoints_in_chunks(read_chunks(),
+                                                       compact=True)
+
+        change_index = ChangeIndex(branchpoints)
+        del branchpoints
+        changes = zip(change_index.changes, change_index.indices)
+        encoded = TextCursor(iter_chunks(encoded_source, chunk_size))
+        original = TextCursor(read_chunks())
+        yield from decode_changes(changes, encoded, original,
+                                  message_bits or change_index.capacity)
+
+
+def write_changes(chunks, changes, destination):
+    """
+    Writes the text given as chunks to destination, with the given changes
+    made.  The changes must be sorted and must not overlap.
+    """
+    changes = iter(changes)
+    change = next(changes, None)
+    # index in the text of the first character of the buffer
+    position = 0
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        pieces = []
+        written = 0
+        while (change is not None and
+                change[1] <= position + len(buffer)):
+            start, end, change_string = change
+            pieces.append(buffer[written:start - position])
+            pieces.append(change_string)
+            written = end - position
+            change = next(changes, None)
+
+        # everything before the next change can be written right away
+        ready = len(buffer)
+        if change is not None:
+            ready = max(min(change[0] - position, ready), written)
+        pieces.append(buffer[written:ready])
+        destination.write(''.join(pieces))
+        buffer = buffer[ready:]
+        position += ready
+    destination.write(buffer)
+
+
+@contextmanager
+def rereadable(source, chunk_size):
+    """
+    Yields a function that returns a fresh iterator over the chunks of
+    source each time it is called.
+    """
+    seekable = getattr(source, 'seekable', None)
+    if seekable is not None and seekable():
+        start = source.tell()
+
+        def read_chunks():
+            source.seek(start)
+            return read_in_chunks(source, chunk_size)
+        yield read_chunks
+        return
+
+    chunks = iter_chunks(source, chunk_size)
+    with tempfile.SpooledTemporaryFile(SPOOL_SIZE, mode='w+', encoding='utf8',
+                                       newline='') as spool_file:
+        def read_chunks():
+            nonlocal chunks
+            if chunks is not None:
+                first_read, chunks = spool(chunks, spool_file), None
+                return first_read
+            spool_file.seek(0)
+            return read_in_chunks(spool_file, chunk_size)
+        yield read_chunks
+
+
+def iter_chunks(source, chunk_size):
+    if hasattr(source, 'read'):
+        return read_in_chunks(source, chunk_size)
+    return iter(source)
+
+
+def read_in_chunks(source, chunk_size):
+    return iter(lambda: source.read(chunk_size), '')
+
+
+def spool(chunks, spool_file):
+    for chunk in chunks:
+        spool_file.write(chunk)
+        yield chunk
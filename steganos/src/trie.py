@@ -0,0 +1,117 @@
+"""
+Finds every occurrence of many phrases in a text in a single pass.
+
+The phrases are stored in a trie, a tree with one edge per character, so
+that all the phrases that start at a position of the text are found by
+walking down the tree once, however many phrases there are.  The positions
+at which any phrase can start are found with a regular expression shaped
+like the trie, whose cost likewise depends on the length of the phrases
+rather than on their number.
+
+Every phrase is matched as re.finditer would match it on its own: its
+occurrences are reported from left to right and never overlap each other,
+although they may overlap occurrences of other phrases.
+
+>> trie = Trie([("can't", 'cannot'), ('cannot', "can't")])
+>> trie.find('I cannot')
+[[(2, 8, "can't")]]
+"""
+import re
+
+# the key of the list of (rank, replacement) of the phrases that end at a
+# node; no character of a text is ever this key
+END = None
+
+
+class Trie:
+    """
+    :param replacements: Pairs of a phrase and the string that replaces it.
+                         The rank of a phrase is its index in this list, and
+                         find orders its results by rank.
+    """
+    def __init__(self, replacements):
+        self.root = {}
+        self.size = 0
+        for rank, (phrase, replacement) in enumerate(replacements):
+            if not phrase:
+                raise ValueError('Cannot match an empty phrase.')
+            node = self.root
+            for char in phrase:
+                node = node.setdefault(char, {})
+            node.setdefault(END, []).append((rank, replacement))
+            self.size += 1
+        pattern = self.pattern()
+        self.starts_re = (None if pattern is None else
+                          re.compile('(?={})'.format(pattern)))
+
+    def pattern(self):
+        """
+        A regular expression that matches the shortest phrase at every
+        position where any phrase starts, or None if there are no phrases.
+        """
+        if not self.root:
+            return None
+        return node_pattern(self.root)
+
+    def first_chars(self):
+        """ a character class of the characters that phrases start with """
+        return ''.join(sorted(re.escape(char) for char in self.root))
+
+    def matches_at(self, text, start):
+        """ yields the rank, end and replacement of every phrase at start """
+        node = self.root
+        index = start
+        length = len(text)
+        while True:
+            for rank, replacement in node.get(END, ()):
+                yield rank, index, replacement
+            if index == length:
+                return
+            node = node.get(text[index])
+            if node is None:
+                return
+            index += 1
+
+    def find(self, text, starts=None):
+        """
+        Returns a branchpoint for every occurrence of every phrase, ordered
+        by the rank of the phrase and then by position.
+
+        :param starts (Optional): The positions where phrases may start, in
+                                  ascending order, as found with pattern().
+                                  They are searched for if not given.
+        """
+        if starts is None:
+            starts = ([] if self.starts_re is None else
+                      [match.start() for match in
+                       self.starts_re.finditer(text)])
+
+        found = [[] for _ in range(self.size)]
+        # the end of the last occurrence of each phrase, which the next one
+        # must not overlap
+        ends = [0] * self.size
+        for start in starts:
+            for rank, end, replacement in self.matches_at(text, start):
+                if start >= ends[rank]:
+                    found[rank].append([(start, end, replacement)])
+                    ends[rank] = end
+        return [branchpoint for occurrences in found
+                for branchpoint in occurrences]
+
+
+def node_pattern(node):
+    """
+    The alternation of the edges below a node.  The search stops at the
+    first node where a phrase ends, since whether a phrase starts at a
+    position is all that is needed.
+    """
+    alternatives = []
+    for char in sorted(char for char in node if char is not END):
+        child = node[char]
+        if END in child:
+            alternatives.append(re.escape(char))
+        else:
+            alternatives.append(re.escape(char) + node_pattern(child))
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return '(?:{})'.format('|'.join(alternatives))
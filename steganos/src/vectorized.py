@@ -0,0 +1,83 @@
+"""
+An optional NumPy backend for the branchpoint rules that test every character
+of a text (directional marks, non-breaking and zero width spaces).
+
+The text is converted to an array of code points once, and each rule becomes
+a boolean mask over that array.  Characters are classified with the same str
+methods as the pure Python rules, through a table indexed by code point, so
+the results are exactly the same.  If NumPy is not installed, numpy is None
+and the pure Python rules are used instead.
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+UPPER = 1
+ALPHA = 2
+SPACE = 4
+
+# code points below this are classified through a table built on first use;
+# the rest are rare and classified one distinct code point at a time
+TABLE_SIZE = 2**16
+_table = None
+
+
+def character_rule_indices(text):
+    """
+    Returns three arrays of indices of the text, in ascending order: the
+    periods followed by whitespace, the uppercase characters, and the
+    alphabetic characters followed by whitespace.
+    """
+    codes = numpy.frombuffer(text.encode('utf-32-le', 'surrogatepass'),
+                             dtype='<u4')
+    classes = classify(codes)
+
+    space_after = numpy.zeros(len(codes), dtype=bool)
+    space_after[:-1] = (classes[1:] & SPACE) != 0
+
+    periods = (codes == ord('.')) & space_after
+    capitals = (classes & UPPER) != 0
+    word_ends = ((classes & ALPHA) != 0) & space_after
+    return (numpy.flatnonzero(periods), numpy.flatnonzero(capitals),
+            numpy.flatnonzero(word_ends))
+
+
+def to_list(indices):
+    """
+    The indices as a list of Python ints, whether they are an array returned
+    by character_rule_indices or already a list.
+    """
+    return indices if isinstance(indices, list) else indices.tolist()
+
+
+def classify(codes):
+    """ the UPPER, ALPHA and SPACE flags of every code point """
+    table = class_table()
+    common = codes < TABLE_SIZE
+    classes = numpy.zeros(len(codes), dtype=numpy.uint8)
+    classes[common] = table[codes[common]]
+
+    rare = ~common
+    if rare.any():
+        distinct, inverse = numpy.unique(codes[rare], return_inverse=True)
+        rare_table = numpy.array([character_class(chr(code))
+                                  for code in distinct.tolist()],
+                                 dtype=numpy.uint8)
+        classes[rare] = rare_table[inverse]
+    return classes
+
+
+def class_table():
+    global _table
+    if _table is None:
+        _table = numpy.array([character_class(chr(code))
+                              for code in range(TABLE_SIZE)],
+                             dtype=numpy.uint8)
+    return _table
+
+
+def character_class(char):
+    return ((UPPER if char.isupper() else 0) |
+            (ALPHA if char.isalpha() else 0) |
+            (SPACE if char.isspace() else 0))
@@ -0,0 +1,209 @@
+"""
+Decodes a piece of an encoded text whose place in the original text is
+known, analyzing only that piece of the original.
+
+Which bit a branchpoint holds depends on every branchpoint before it, and on
+whether the global branchpoints were kept, so the bits of a piece cannot be
+numbered from the piece alone.  A WindowIndex records, once, what numbering
+them takes: where the original text can be split into segments (see the
+segments module), its unchangeable areas, a flag per candidate branchpoint
+for whether it was kept and the indices of the global branchpoints.  With it
+only the segments that a piece of the text lies in are analyzed, so decoding
+takes time in proportion to the piece rather than to the whole text.
+
+The index takes about a bit per candidate branchpoint and a few numbers per
+segment, much less than the branchpoints themselves:
+
+>> index = WindowIndex.build(original_text)
+>> save_window_index(index, 'original.win')
+>> index = load_window_index('original.win')
+>> steganos.decode_partial_text(encoded_text, original_text, (start, end),
+..                              window_index=index)
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+
+from .branchpoints import (DEFAULT_ANALYZER, GREEDY,
+                           mutually_exclusive_branchpoints)
+from .segments import MARGIN, analyze_segment, iter_segments
+from .store import map_columns, write_columns
+
+# the approximate length of a segment, which is the least that decoding a
+# piece of text analyzes around it
+SEGMENT_SIZE = 4096
+
+
+class WindowIndex:
+    """
+    Segment k of the text starts at offsets[k] and ends at offsets[k + 1].
+    Its candidate local branchpoints are numbered from candidate_counts[k],
+    and those that were kept from kept_counts[k] (after the global ones);
+    candidate i was kept if bit i of kept is set.  global_indices holds the
+    index of the branchpoint of each global rule of the default analyzer (the
+    single quotes and the single digit rules), or -1 if there is none.
+    Unchangeable areas are given by area_starts and area_ends, sorted by
+    start.
+    """
+    def __init__(self, length, offsets, area_starts, area_ends,
+                 candidate_counts, kept_counts, kept, global_indices,
+                 strategy=GREEDY):
+        self.length = length
+        self.offsets = offsets
+        self.area_starts = area_starts
+        self.area_ends = area_ends
+        self.candidate_counts = candidate_counts
+        self.kept_counts = kept_counts
+        self.kept = kept
+        self.global_indices = global_indices
+        self.strategy = strategy
+        # the kept local branchpoints are numbered after the global ones
+        self.global_count = sum(1 for index in global_indices if index >= 0)
+        self.capacity = kept_counts[-1] + self.global_count
+
+    @classmethod
+    def build(cls, text, strategy=GREEDY, segment_size=SEGMENT_SIZE):
+        """
+        Analyzes the whole text once, finding the same branchpoints as
+        get_all_branchpoints(text, strategy).
+
+        :param segment_size: The approximate length of a segment.
+        """
+        chunks = (text[index:index + segment_size]
+                  for index in range(0, len(text), segment_size))
+        offsets = array('q')
+        area_starts = array('q')
+        area_ends = array('q')
+        candidate_counts = array('q', [0])
+        local_branchpoints = []
+        global_changes = [[] for _ in DEFAULT_ANALYZER.global_rules]
+        for segment in iter_segments(chunks):
+            offset = segment[0]
+            offsets.append(offset)
+            for start, end in sorted(segment[4]):
+                area_starts.append(start + offset)
+                area_ends.append(end + offset)
+            segment_branchpoints, segment_globals = analyze_segment(*segment)
+            local_branchpoints.extend(segment_branchpoints)
+            for changes, segment_changes in zip(global_changes,
+                                                segment_globals):
+                changes.extend(segment_changes)
+            candidate_counts.append(len(local_branchpoints))
+        offsets.append(len(text))
+
+        # as in segments.merge_segments
+        global_branchpoints = [bp for bp in global_changes if bp]
+        branchpoints = mutually_exclusive_branchpoints(
+            global_branchpoints + local_branchpoints, strategy)
+        kept_ids = {id(branchpoint) for branchpoint in branchpoints}
+
+        global_indices = []
+        kept_globals = 0
+        for branchpoint in global_changes:
+            if branchpoint and id(branchpoint) in kept_ids:
+                global_indices.append(kept_globals)
+                kept_globals += 1
+            else:
+                global_indices.append(-1)
+
+        kept = bytearray(-(-len(local_branchpoints) // 8))
+        kept_counts = array('q', [0])
+        count = 0
+        for segment in range(len(offsets) - 1):
+            for index in range(candidate_counts[segment],
+                               candidate_counts[segment + 1]):
+                if id(local_branchpoints[index]) in kept_ids:
+                    kept[index >> 3] |= 1 << (index & 7)
+                    count += 1
+            kept_counts.append(count)
+
+        return cls(len(text), offsets, area_starts, area_ends,
+                   candidate_counts, kept_counts, kept, global_indices,
+                   strategy)
+
+    def relevant_changes(self, text, start, end):
+        """
+        Returns the same changes as steganos_decode.get_relevant_changes
+        does with a ChangeIndex of the whole text, analyzing only the
+        segments that changes starting in [start, end) can come from.
+
+        :param text: The original text the index was built from.
+        """
+        if len(text) != self.length:
+            raise ValueError('The text is not the one the window index was '
+                             'built from.')
+        offsets = self.offsets
+        segments = len(offsets) - 1
+        first = max(bisect_right(offsets, start) - 1, 0)
+        last = min(bisect_left(offsets, end), segments)
+
+        relevant = []
+        for segment in range(first, last):
+            for change, index in self.segment_changes(text, segment):
+                change_start, change_end, change_string = change
+                if (start <= change_start < end and
+                        0 < change_end - start <= end - start):
+                    relevant.append(((change_start - start,
+                                      change_end - start, change_string),
+                                     index))
+        relevant.sort()
+        return relevant
+
+    def segment_changes(self, text, segment):
+        """
+        Yields the changes of the kept branchpoints that start in a segment
+        of the text, each with the index of its branchpoint.
+        """
+        offset = self.offsets[segment]
+        segment_end = self.offsets[segment + 1]
+        first_area = bisect_left(self.area_starts, offset)
+        last_area = bisect_left(self.area_starts, segment_end)
+        areas = [(self.area_starts[index] - offset,
+                  self.area_ends[index] - offset)
+                 for index in range(first_area, last_area)]
+        local_branchpoints, global_changes = analyze_segment(
+            offset, text[offset - 1:offset] if offset else '',
+            text[offset:segment_end],
+            text[segment_end:segment_end + MARGIN], areas)
+
+        candidate = self.candidate_counts[segment]
+        if len(local_branchpoints) != (self.candidate_counts[segment + 1] -
+                                       candidate):
+            raise ValueError('The text is not the one the window index was '
+                             'built from.')
+        kept = self.kept
+        index = self.global_count + self.kept_counts[segment]
+        for branchpoint in local_branchpoints:
+            if kept[candidate >> 3] >> (candidate & 7) & 1:
+                for change in branchpoint:
+                    yield change, index
+                index += 1
+            candidate += 1
+
+        for changes, global_index in zip(global_changes,
+                                         self.global_indices):
+            if global_index >= 0:
+                for change in changes:
+                    yield change, global_index
+
+
+def save_window_index(index, path):
+    """ writes a WindowIndex to a file, see the store module """
+    write_columns(path, {'kind': 'window', 'length': index.length,
+                         'strategy': index.strategy,
+                         'global_indices': index.global_indices},
+                  [('offsets', 'q', index.offsets),
+                   ('area_starts', 'q', index.area_starts),
+                   ('area_ends', 'q', index.area_ends),
+                   ('candidate_counts', 'q', index.candidate_counts),
+                   ('kept_counts', 'q', index.kept_counts),
+                   ('kept', 'B', index.kept)])
+
+
+def load_window_index(path):
+    """ maps a file written by save_window_index as a WindowIndex """
+    header, column = map_columns(path, 'window')
+    return WindowIndex(header['length'], column('offsets'),
+                       column('area_starts'), column('area_ends'),
+                       column('candidate_counts'), column('kept_counts'),
+                       column('kept'), header['global_indices'],
+                       header['strategy'])
@@ -0,0 +1,40 @@
+from ..src import alignment
+
+
+def test_strip_inserted_characters():
+    # given
+    text = 'A\u2060 word\u200b.\u200f\u200e'
+
+    # when
+    result = alignment.strip_inserted_characters(text)
+
+    # then
+    assert result == 'A word.'
+
+
+def test_lookup_finds_sampled_positions():
+    # given
+    text = 'abcdefgh abcdefgh'
+    index = alignment.AlignmentIndex(text, gram=4, step=3)
+
+    # when
+    result = list(index.lookup('abcd'))
+
+    # then
+    assert result == [0, 9]
+
+
+def test_candidate_starts_include_start_of_encoded_text():
+    # given
+    text = 'Some preamble.  I am 9 years old and I live in a house.'
+    encoded_text = 'I am nine years old and I\u200b live in a house.'
+    changes = [(21, 22, 'nine'), (36, 36, '\u200b')]
+    index = alignment.AlignmentIndex(text, gram=4, step=2)
+
+    # when
+    result = alignment.candidate_starts(encoded_text, index, changes,
+                                        [21, 36])
+
+    # then
+    assert 16 in result
+    assert len(result) < len(text) // 4
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+from ..src import benchmark
+
+
+@pytest.mark.parametrize('shape', ['prose', 'markdown', 'digits'])
+def test_synthetic_text_has_requested_size(shape):
+    # when
+    result = benchmark.synthetic_text(shape, 1234)
+
+    # then
+    assert len(result) == 1234
+
+
+def test_benchmark_writes_json(tmp_path):
+    # given
+    output = tmp_path / 'results.json'
+
+    # when
+    benchmark.main(['--sizes', '500', '--output', str(output)])
+
+    # then
+    report = json.loads(output.read_text())
+    operations = {result['operation'] for result in report['results']}
+    assert {'bit_capacity', 'encode', 'decode_full_text',
+            'decode_partial_text', 'rule:tab'} <= operations
+    assert {result['document'] for result in report['results']} == \
+        {'prose-500', 'markdown-500', 'digits-500'}
+
+
+def test_benchmark_reports_error_of_decode_with_encoded_range(monkeypatch):
+    # given
+    def get_indices(*args):
+        raise ValueError('no fit')
+    monkeypatch.setattr(benchmark.steganos_decode, 'get_indices', get_indices)
+    text = benchmark.synthetic_text('prose', 3000)
+
+    # when
+    results = {result['operation']: result
+               for result in benchmark.run_document('prose', text, 10000)}
+
+    # then
+    assert results['decode_partial_text']['error'] == 'no fit'
+    assert results['decode_partial_text:encoded_range'] == dict(
+        document='prose', bytes=3000,
+        operation='decode_partial_text:encoded_range', seconds=None,
+        error='no fit')
+
+
+def test_sample_text_has_requested_size():
+    assert len(benchmark.sample_text(100000)) == 100000
@@ -0,0 +1,126 @@
+import random
+
+import pytest
+from ..src.bits import Bits, bit_flags, bytes_to_string, string_to_bytes
+from ..src.plan import prepare
+from ..src.steganos_encode import encode
+
+
+def test_bits_from_bytes():
+    # given
+    bits = Bits(b'Hi')
+
+    # then
+    assert len(bits) == 16
+    assert str(bits) == '0100100001101001'
+    assert bits[1] == '1'
+    assert bits[-1] == '1'
+    assert bits.tobytes() == b'Hi'
+
+
+def test_bits_with_unknown_bits():
+    # given
+    bits = Bits.from_string('01?1000')
+
+    # then
+    assert len(bits) == 7
+    assert str(bits) == '01?1000'
+    assert bits[2] == '?'
+    assert bits == '01?1000'
+    assert bits.tobytes() == b'?'
+
+
+def test_bits_rejects_length_longer_than_data():
+    with pytest.raises(ValueError):
+        Bits(b'a', 9)
+
+
+def test_bit_flags_of_every_form_of_message():
+    # given
+    expected = bytes([0, 1, 1, 0, 0, 0, 0, 1])
+
+    # then
+    assert bit_flags('01100001') == expected
+    assert bit_flags(list('01100001')) == expected
+    assert bytes(bit_flags(b'a')) == expected
+    assert bytes(bit_flags(Bits(b'a'))) == expected
+    assert bit_flags('01?00001') == bytes([0, 1, 0, 0, 0, 0, 0, 1])
+    assert bytes(bit_flags(Bits.from_string('01?0001'))) == bytes(
+        [0, 1, 0, 0, 0, 0, 1])
+
+
+def test_packed_flags_are_read_from_the_packed_bytes():
+    # given
+    flags = bit_flags(Bits(b'\xa5\x80', 9))
+
+    # then
+    assert len(flags) == 9
+    assert flags.data == b'\xa5\x80'
+    assert [flags[index] for index in range(9)] == [1, 0, 1, 0, 0, 1, 0, 1,
+                                                    1]
+
+
+def test_string_to_bytes_matches_byte_at_a_time_conversion():
+    # given
+    rng = random.Random(0)
+    strings = [''.join(rng.choice('01?') for _ in range(length))
+               for length in (0, 3, 8, 16, 21)]
+    strings += [''.join(rng.choice('01') for _ in range(64))]
+
+    def byte_at_a_time(binary):
+        result = []
+        for index in range(0, len(binary), 8):
+            try:
+                result.append(int(binary[index:index + 8], base=2))
+            except ValueError:
+                result.append(ord('?'))
+        return bytes(result)
+
+    # then
+    for string in strings:
+        assert string_to_bytes(string) == byte_at_a_time(string)
+
+
+def test_bytes_to_string_round_trip():
+    # given
+    message = bytes(range(256))
+
+    # when
+    string = bytes_to_string(message)
+
+    # then
+    assert string == ''.join(bin(byte)[2:].rjust(8, '0')
+                             for byte in message)
+    assert string_to_bytes(string) == message
+
+
+def test_encode_accepts_packed_messages():
+    # given
+    text = ('"Hello," he said.\n\t"I am 9 years old" and "she is 10" '
+            'and "they are 11"\n\t\t"we\'re 3"') * 4
+    plan = prepare(text)
+
+    # when
+    encoded_text = encode(b'\xa5', text)
+
+    # then
+    assert encoded_text == encode('10100101', text)
+    assert plan.encode(Bits(b'\xa5')) == encoded_text
+    decoded = plan.decode_full_text(encoded_text, 8, packed=True)
+    assert isinstance(decoded, Bits)
+    assert decoded.tobytes() == b'\xa5'
+    assert decoded.known is None
+
+
+def test_packed_decode_marks_bits_that_were_not_recovered():
+    # given
+    text = '"Hello," he said.\n\t"I am 9 years old"'
+    encoded_text = encode('101', text)
+
+    # when
+    decoded = prepare(text).decode_partial_text(encoded_text[:8], (0, 8),
+                                                message_bits=3, packed=True)
+
+    # then
+    assert decoded == '?0?'
+    assert decoded.known == b'\x40'
@@ -154,7 +154,9 @@ def test_filter_branchpoints_on_urls():
     ([(3, 5, 'ab')], []),
     ([(1, 6, 'ab')], []),
     ([(1, 3, 'ab'), (8, 10, 'xy')], []),
-    ([(1, 3, 'ab'), (5, 6, 'ab')], [(5, 6, 'ab')])
+    ([(1, 3, 'ab'), (5, 6, 'ab')], [(5, 6, 'ab')]),
+    ([(4, 7, 'ab'), (2, 2, 'ab'), (9, 9, 'ab')],
+     [(4, 7, 'ab'), (2, 2, 'ab'), (9, 9, 'ab')])
 ])
 def test_changeable_part_of_branchpoints(branchpoint, expected):
     # given
@@ -166,3 +168,139 @@ def test_changeable_part_of_branchpoints(branchpoint, expected):
     # then
     assert result == expected
 
+def test_changeable_part_with_adjacent_areas():
+    # given
+    area_index = AreaIndex([(4, 6), (0, 2), (2, 4)])
+
+    # when
+    result = changeable_part([(2, 2, 'x'), (3, 3, 'x'), (1, 7, 'x')],
+                             area_index)
+
+    # then
+    assert result == [(2, 2, 'x')]
+
+@pytest.mark.parametrize('text', [
+    '\t"I can\'t," Mr. Smith said. "It is not 2 or 3." '
+    '\u00c9t\u00e9 est l\u00e0.',
+    'how willwould haven\'t\tHADN\'T 1.5 and 7\n',
+    '',
+])
+def test_scan_branchpoints_matches_each_rule(text):
+    # when
+    result = scan_branchpoints(text)
+
+    # then
+    assert result == {
+        'tab': get_tab_branchpoints(text),
+        'contraction': get_contraction_branchpoints(text),
+        'directional_mark': get_directional_mark_branchpoints(text),
+        'non_breaking': get_non_breaking_branchpoints(text),
+        'zero_width_space': get_zero_width_space_branchpoints(text),
+        'single_quotes': get_single_quotes_branchpoint(text),
+        'single_digit': get_single_digit_branchpoint(text),
+    }
+
+def test_optimal_strategy_keeps_more_branchpoints_than_greedy():
+    # given
+    data = [[(3, 5, 'x')], [(3, 3, 'x'), (3, 4, 'x')], [(0, 1, 'x')]]
+
+    # when
+    greedy = mutually_exclusive_branchpoints(data, GREEDY)
+    optimal = mutually_exclusive_branchpoints(data, OPTIMAL)
+
+    # then
+    assert greedy == [[(0, 1, 'x')]]
+    assert optimal == [[(3, 5, 'x')], [(0, 1, 'x')]]
+
+def test_optimal_strategy_never_keeps_intersecting_changes():
+    # given
+    text = '"Hi," he said\tto 2 of\tthem. "Isn\'t it 9?"'
+
+    # when
+    branchpoints = get_all_branchpoints(text, OPTIMAL)
+
+    # then
+    changes = sorted(change for bp in branchpoints for change in bp)
+    assert all(previous[1] < change[0]
+               for previous, change in zip(changes, changes[1:]))
+    assert len(branchpoints) >= len(get_all_branchpoints(text))
+
+def test_optimal_strategy_falls_back_to_greedy_past_max_steps():
+    # given
+    data = [[(3, 5, 'x')], [(3, 3, 'x'), (3, 4, 'x')], [(0, 1, 'x')]]
+
+    # when
+    optimal = optimal_branchpoints(data, max_steps=1)
+
+    # then
+    assert optimal == [[(0, 1, 'x')]]
+    assert optimal_branchpoints(data, max_steps=2) == [[(3, 5, 'x')],
+                                                       [(0, 1, 'x')]]
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        mutually_exclusive_branchpoints([[(0, 1, 'x')]], 'fastest')
+
+def test_change_index():
+    # given
+    branchpoints = [[(7, 8, "'"), (0, 1, "'")], [(3, 3, '\u200b')]]
+
+    # when
+    change_index = ChangeIndex(branchpoints)
+
+    # then
+    assert change_index.changes == [(0, 1, "'"), (3, 3, '\u200b'),
+                                    (7, 8, "'")]
+    assert change_index.indices == [0, 1, 0]
+    assert change_index.capacity == 2
+    assert list(change_index.starting_between(1, 8)) == [1, 2]
+
+def test_analyzer_matches_default_rules():
+    # given
+    text = '"Hi," he said.\tI can\'t stay. There are 3 of them.'
+
+    # when
+    result = Analyzer().find_all_branchpoints(text)
+
+    # then
+    assert result == find_all_branchpoints(text)
+    assert Analyzer().ruleset == RULESET
+
+def test_analyzer_with_disabled_rules():
+    # given
+    text = 'He said. Mary left\tLondon'
+    analyzer = Analyzer(disabled=['zero_width_space', 'non_breaking'])
+
+    # when
+    result = analyzer.find_all_branchpoints(text)
+
+    # then
+    assert result == [[(7, 7, '\u200f\u200e')], [(18, 19, '    ')]]
+    assert analyzer.ruleset != RULESET
+    assert (analyzer.ruleset ==
+            Analyzer(disabled=['non_breaking', 'zero_width_space']).ruleset)
+
+def test_analyzer_without_any_rules():
+    assert Analyzer(rules=[]).find_all_branchpoints('He said. "Hi"') == []
+
+def test_analyzer_with_unknown_rule():
+    with pytest.raises(ValueError):
+        Analyzer(disabled=['oxford_comma'])
+
+def test_analyzer_with_registered_rule(monkeypatch):
+    # given
+    from ..src import branchpoints
+    monkeypatch.setattr(branchpoints, 'RULES', dict(RULES))
+    register_rule('ampersand', lambda text: [[(index, index + 1, 'and')]
+                                             for index, char in
+                                             enumerate(text) if char == '&'])
+    text = 'salt & pepper'
+
+    # when
+    result = Analyzer(rules=['ampersand', 'tab']).find_all_branchpoints(text)
+
+    # then
+    assert result == [[(5, 6, 'and')]]
+    assert (5, 6, 'and') not in sum(find_all_branchpoints(text), [])
+    assert Analyzer(rules=['ampersand']).scan(text) == {
+        'ampersand': [[(5, 6, 'and')]]}
@@ -0,0 +1,71 @@
+import pytest
+from ..src import cache
+from ..src import steganos_encode
+from ..src.branchpoints import get_all_branchpoints
+
+
+@pytest.fixture
+def branchpoint_cache():
+    yield cache.enable_cache(max_entries=2)
+    cache.disable_cache()
+
+
+def test_cache_is_disabled_by_default():
+    assert cache.cache_info() is None
+
+
+def test_repeated_text_hits_cache(branchpoint_cache):
+    # given
+    text = '"I am 9," he said.'
+
+    # when
+    first = get_all_branchpoints(text)
+    second = get_all_branchpoints(text)
+
+    # then
+    assert first is second
+    assert cache.cache_info()['hits'] == 1
+    assert cache.cache_info()['misses'] == 1
+
+
+def test_encode_uses_cache(branchpoint_cache):
+    # given
+    text = '"I am 9," he said.'
+
+    # when
+    steganos_encode.encode('1', text)
+    steganos_encode.encode('0', text)
+
+    # then
+    assert cache.cache_info()['hits'] == 1
+
+
+def test_least_recently_used_entry_is_evicted(branchpoint_cache):
+    # given
+    get_all_branchpoints('"a"')
+    get_all_branchpoints('"b"')
+    get_all_branchpoints('"a"')
+
+    # when
+    get_all_branchpoints('"c"')
+
+    # then
+    assert cache.cache_info()['entries'] == 2
+    assert branchpoint_cache.get(cache.cache_key('"a"', ('default', 'greedy')))
+    assert branchpoint_cache.get(
+        cache.cache_key('"b"', ('default', 'greedy'))) is None
+
+
+def test_cache_respects_max_bytes():
+    # given
+    branchpoint_cache = cache.BranchpointCache(max_entries=10, max_bytes=1000)
+    branchpoints = [[(0, 1, "'")]]
+    size = cache.branchpoints_size(branchpoints)
+
+    # when
+    for key in range(1000 // size + 1):
+        branchpoint_cache.put(key, branchpoints)
+
+    # then
+    assert branchpoint_cache.info()['bytes'] <= 1000
+    assert branchpoint_cache.get(0) is None
@@ -0,0 +1,103 @@
+from array import array
+
+import pytest
+from ..src import steganos_decode
+from ..src import steganos_encode
+from ..src.branchpoints import ChangeIndex, get_all_branchpoints
+from ..src.compact import CompactBranchpoints, CompactChanges
+from ..src.plan import prepare
+
+TEXT = '"I am 9\t," he said. "I can\'t stay."'
+
+
+def test_compact_branchpoints_behave_as_a_list():
+    # given
+    branchpoints = [[(0, 1, "'"), (7, 8, "'")], [(3, 3, '\u200b')], []]
+
+    # when
+    compact = CompactBranchpoints(branchpoints)
+
+    # then
+    assert len(compact) == 3
+    assert list(compact) == branchpoints
+    assert compact[1] == [(3, 3, '\u200b')]
+    assert compact[-3] == [(0, 1, "'"), (7, 8, "'")]
+    assert compact[1:] == branchpoints[1:]
+    assert compact == branchpoints
+    assert compact.strings == ["'", '\u200b']
+    with pytest.raises(IndexError):
+        compact[3]
+
+
+def test_extend_compact_branchpoints():
+    # given
+    compact = CompactBranchpoints([[(0, 1, "'"), (7, 8, "'")]])
+    other = CompactBranchpoints([[(3, 3, '\u200b')], [(4, 5, "'")]])
+
+    # when
+    compact.extend(other)
+    compact.extend([[(9, 9, '\t')]])
+
+    # then
+    assert compact == [[(0, 1, "'"), (7, 8, "'")], [(3, 3, '\u200b')],
+                       [(4, 5, "'")], [(9, 9, '\t')]]
+    assert compact.strings == ["'", '\u200b', '\t']
+
+
+def test_encode_and_decode_with_compact_branchpoints():
+    # given
+    branchpoints = get_all_branchpoints(TEXT)
+    compact = CompactBranchpoints(branchpoints)
+
+    # when
+    encoded_text = steganos_encode.encode('101', TEXT, compact)
+    result = steganos_decode.decode_full_text(encoded_text, TEXT, 3, compact)
+
+    # then
+    assert encoded_text == steganos_encode.encode('101', TEXT, branchpoints)
+    assert result == '101'
+
+
+def test_compact_plan():
+    # given
+    plan = prepare(TEXT, compact=True)
+
+    # when
+    encoded_text = plan.encode('110')
+
+    # then
+    assert isinstance(plan.branchpoints, CompactBranchpoints)
+    assert plan.decode_partial_text(encoded_text[5:], message_bits=3) == \
+        steganos_decode.decode_partial_text(encoded_text[5:], TEXT,
+                                            message_bits=3)
+
+
+def test_change_index_of_compact_branchpoints():
+    # given
+    branchpoints = get_all_branchpoints(TEXT)
+
+    # when
+    change_index = ChangeIndex(CompactBranchpoints(branchpoints))
+
+    # then
+    expected = ChangeIndex(branchpoints)
+    assert isinstance(change_index.changes, CompactChanges)
+    assert isinstance(change_index.indices, array)
+    assert list(change_index.changes) == expected.changes
+    assert list(change_index.indices) == expected.indices
+    assert list(change_index.starts) == expected.starts
+    assert change_index.capacity == expected.capacity
+
+
+def test_change_index_of_changes_that_start_together():
+    # given
+    branchpoints = [[(4, 6, 'b')], [(4, 5, 'b'), (0, 1, 'x')],
+                    [(4, 5, 'a')], [(2, 3, 'y')], [(4, 5, 'a')]]
+
+    # when
+    change_index = ChangeIndex(CompactBranchpoints(branchpoints))
+
+    # then
+    expected = ChangeIndex(branchpoints)
+    assert list(change_index.changes) == expected.changes
+    assert list(change_index.indices) == expected.indices
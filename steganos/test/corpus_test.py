@@ -0,0 +1,76 @@
+import pytest
+from ..src.corpus import (CorpusIndex, load_corpus, normalize, save_corpus,
+                          text_index, winnow)
+from ..src.plan import prepare
+from ..src.steganos_decode import get_indices
+
+TEXTS = {
+    'letter': ('"Dear Mary," he wrote.\tI can\'t come to London on the 3rd, '
+               'as the trains are not running. Does that work for you? '
+               'We would have gone together if it were not for the strike. '
+               'I hope the weather holds up until then.'),
+    'minutes': ('The committee met at 9 and discussed the budget. It was '
+                'agreed that the report is not ready. The chair said they '
+                'would have it by Friday. Members asked how will the costs '
+                'be covered, and the meeting closed at 11.'),
+}
+
+
+def test_normalize():
+    # given
+    text = 'a \t"b\u200b c\n\nd\u2060'
+
+    # when
+    normalized, normalized_starts, starts = normalize(text)
+
+    # then
+    assert normalized == "a 'b c d"
+    assert ([text_index(index, normalized_starts, starts)
+             for index in range(len(normalized))] ==
+            [0, 1, 3, 4, 5, 7, 8, 10])
+
+
+@pytest.mark.parametrize('hashes, window, selected', [
+    ([5, 3, 4, 3, 6, 1], 3, [1, 3, 5]),
+    ([2, 2, 2], 2, [1, 2]),
+    ([4, 1], 3, [1]),
+    ([], 3, []),
+])
+def test_winnow(hashes, window, selected):
+    assert winnow(hashes, window) == selected
+
+
+def test_candidates_of_encoded_piece():
+    # given
+    index = CorpusIndex.build(TEXTS.items())
+    plan = prepare(TEXTS['minutes'])
+    encoded_text = plan.encode('1101')
+    piece = encoded_text[40:160]
+    original_start, _ = get_indices(piece, plan.text, plan.branchpoints)
+
+    # when
+    result = index.candidates(piece)
+
+    # then
+    name, start, score = result[0]
+    assert name == 'minutes'
+    assert abs(start - original_start) < 5
+    assert 0 < score <= 1
+    assert index.candidates('nothing like any of the texts at all here') == []
+
+
+def test_attribute_saved_corpus(tmp_path):
+    # given
+    path = str(tmp_path / 'corpus.stg')
+    save_corpus(CorpusIndex.build(TEXTS.items()), path)
+    plans = {name: prepare(text) for name, text in TEXTS.items()}
+    encoded_text = plans['letter'].encode('1011')
+
+    # when
+    index = load_corpus(path)
+    result = index.attribute(encoded_text[30:], plans.get, message_bits=4)
+
+    # then
+    assert len(index) == 2
+    assert result == [('letter', plans['letter'].decode_partial_text(
+        encoded_text[30:], message_bits=4))]
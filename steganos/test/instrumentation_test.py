@@ -0,0 +1,37 @@
+from ..src import instrumentation
+from ..src.branchpoints import get_all_branchpoints
+
+
+def test_instrument_reports_every_stage():
+    # given
+    text = 'I say "I can\'t" to [a link](http://x.com/9). Then 7 more.'
+    records = []
+
+    # when
+    with instrumentation.instrument(records.append) as report:
+        branchpoints = get_all_branchpoints(text)
+
+    # then
+    assert report.records == records
+    assert [record['stage'] for record in records] == [
+        'scan', 'sort_branchpoints', 'changeable_part',
+        'remove_redundant_characters', 'mutually_exclusive_branchpoints']
+    assert records[0]['changes']['tab'] == 0
+    assert records[0]['changes']['single_digit'] == 2
+    assert records[2]['dropped']['single_digit'] == 1
+    assert (sum(records[-1]['changes'].values()) ==
+            sum(len(bp) for bp in branchpoints))
+    assert set(report.totals()) == {record['stage'] for record in records}
+
+
+def test_nothing_is_reported_outside_instrument():
+    # given
+    with instrumentation.instrument() as report:
+        pass
+
+    # when
+    get_all_branchpoints('"Hello."')
+
+    # then
+    assert report.records == []
+    assert not instrumentation.enabled()
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+from ..src import vectorized
+from ..src.payloads import PayloadRegistry, load_registry, save_registry
+
+
+def registry_of(bits, count, seed=0):
+    rng = random.Random(seed)
+    registry = PayloadRegistry(bits)
+    for index in range(count):
+        registry.add('recipient-{}'.format(index),
+                     ''.join(rng.choice('01') for _ in range(bits)))
+    return registry
+
+
+def test_match_ignores_unrecovered_bits(monkeypatch):
+    # given
+    monkeypatch.setattr(vectorized, 'numpy', None)
+    registry = PayloadRegistry(6)
+    registry.add('alice', '101100')
+    registry.add('bob', '011100')
+    registry.add('carol', '101111')
+
+    # when
+    result = registry.match('1?11??', limit=2)
+
+    # then
+    assert result == [('alice', 0, 1.0), ('carol', 0, 1.0)]
+    assert registry.match('01?1??', limit=1) == [('bob', 0, 1.0)]
+    assert registry.match('??????', limit=1) == [('alice', 0, 0.0)]
+
+
+@pytest.mark.parametrize('bits', [1, 30, 64, 100])
+def test_match_is_the_same_with_and_without_numpy(bits, monkeypatch):
+    pytest.importorskip('numpy')
+    # given
+    registry = registry_of(bits, 200)
+    rng = random.Random(bits)
+    decoded = [''.join(rng.choice('01?') for _ in range(bits))
+               for _ in range(10)]
+    with_numpy = [registry.match(message, limit=7) for message in decoded]
+    monkeypatch.setattr(vectorized, 'numpy', None)
+
+    # when
+    result = [registry.match(message, limit=7) for message in decoded]
+
+    # then
+    assert result == with_numpy
+
+
+def test_match_finds_the_payload_of_a_damaged_message():
+    # given
+    registry = registry_of(48, 1000)
+    payload = ''.join(random.Random(7).choice('01') for _ in range(48))
+    registry.add('leaker', payload)
+    decoded = ''.join('?' if index % 3 else bit
+                      for index, bit in enumerate(payload))
+
+    # when
+    result = registry.match(decoded, limit=3)
+
+    # then
+    assert result[0] == ('leaker', 0, 1.0)
+    assert result[1][2] < 1.0
+
+
+def test_invalid_payloads():
+    registry = PayloadRegistry(4)
+    with pytest.raises(ValueError):
+        registry.add('alice', '101')
+    with pytest.raises(ValueError):
+        registry.add('alice', '10?1')
+    with pytest.raises(ValueError):
+        registry.match('10?')
+
+
+def test_saved_registry(tmp_path):
+    # given
+    path = str(tmp_path / 'payloads.stg')
+    registry = registry_of(20, 50)
+    save_registry(registry, path)
+
+    # when
+    loaded = load_registry(path)
+    loaded.add('late', '0' * 20)
+
+    # then
+    assert loaded.recipients[:50] == registry.recipients
+    assert loaded.match('1?0' * 6 + '11') == registry.match('1?0' * 6 + '11')
+    assert loaded.match('0' * 20, limit=1) == [('late', 0, 1.0)]
@@ -0,0 +1,82 @@
+from ..src import steganos_decode
+from ..src import steganos_encode
+from ..src.branchpoints import Analyzer
+from ..src.plan import prepare
+
+
+def test_plan_encode_matches_encode():
+    # given
+    text = '"I am 9\t," he said. "I can\'t stay."'
+    plan = prepare(text)
+
+    # when
+    result = plan.encode('101')
+
+    # then
+    assert result == steganos_encode.encode('101', text)
+
+
+def test_plan_capacity():
+    # given
+    text = '"I am 9\t," he said. "I can\'t stay."'
+
+    # when
+    result = prepare(text).bit_capacity()
+
+    # then
+    assert result == steganos_encode.bit_capacity(text)
+
+
+def test_plan_round_trip_for_many_messages():
+    # given
+    text = '"I am 9\t," he said. "I can\'t stay."'
+    plan = prepare(text)
+
+    for bits in ['0', '1', '01', '110']:
+        # when
+        encoded_text = plan.encode(bits)
+        result = plan.decode_full_text(encoded_text, message_bits=len(bits))
+
+        # then
+        assert result == bits
+
+
+def test_plan_partial_decode_matches_decode_partial_text():
+    # given
+    text = 'I am 9\t, but I say "I am 8".'
+    plan = prepare(text)
+    encoded_text = plan.encode('111')
+
+    # when
+    result = plan.decode_partial_text(encoded_text[0:15])
+
+    # then
+    assert result == steganos_decode.decode_partial_text(encoded_text[0:15],
+                                                         text)
+
+
+def test_plan_round_trip_with_optimal_strategy():
+    # given
+    text = '"I am 9\t," he said. "I can\'t stay."'
+    plan = prepare(text, strategy='optimal')
+
+    # when
+    encoded_text = plan.encode('1011')
+    result = plan.decode_full_text(encoded_text, message_bits=4)
+
+    # then
+    assert result == '1011'
+
+
+def test_plan_with_analyzer():
+    # given
+    text = '"I am 9\t," he said. "I can\'t stay."'
+    analyzer = Analyzer(rules=['tab', 'contraction'])
+
+    # when
+    plan = prepare(text, analyzer=analyzer)
+    encoded_text = plan.encode('10')
+
+    # then
+    assert plan.bit_capacity() == 2
+    assert plan.decode_full_text(encoded_text, message_bits=2) == '10'
@@ -0,0 +1,142 @@
+import pytest
+from ..src import segments
+from ..src.branchpoints import get_all_branchpoints
+from ..src.compact import CompactBranchpoints
+
+MARKDOWN = ('# Title\n\nI won\'t say "no" to [a link](http://x.com/a?b=9). '
+            'Here is code:\n```py\nx = "9"\n```\n\tSee https://foo.bar/baz '
+            'and ![an image](a.png).  It is not 7, it cannot be. [unclosed '
+            'and `` ticks.  The End.')
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 5, 17, 64, 1000])
+def test_branchpoints_in_chunks_match_whole_text(chunk_size):
+    # given
+    chunks = [MARKDOWN[i:i + chunk_size]
+              for i in range(0, len(MARKDOWN), chunk_size)]
+
+    # when
+    result = segments.find_branchpoints_in_chunks(chunks)
+
+    # then
+    assert result == get_all_branchpoints(MARKDOWN)
+
+
+def test_branchpoints_in_chunks_insert_at_end_of_text():
+    # given
+    text = 'The End.\n## Chapter D'
+
+    # when
+    result = segments.find_branchpoints_in_chunks([text[:12], text[12:]])
+
+    # then
+    assert [(21, 21, '\u2060')] in result
+    assert result == get_all_branchpoints(text)
+
+
+@pytest.mark.parametrize('strategy', ['greedy', 'optimal'])
+def test_compact_branchpoints_in_chunks_match_whole_text(strategy):
+    # given
+    text = MARKDOWN * 3
+    chunks = [text[i:i + 17] for i in range(0, len(text), 17)]
+
+    # when
+    result = segments.find_branchpoints_in_chunks(chunks, strategy,
+                                                  compact=True)
+
+    # then
+    assert isinstance(result, CompactBranchpoints)
+    assert result == get_all_branchpoints(text, strategy)
+
+
+def test_branchpoints_in_chunks_ignore_registered_rules(monkeypatch):
+    # given
+    from ..src import branchpoints
+    monkeypatch.setattr(branchpoints, 'RULES', dict(branchpoints.RULES))
+    branchpoints.register_rule('ampersand',
+                               lambda text: [[(index, index + 1, 'and')]
+                                             for index, char in
+                                             enumerate(text) if char == '&'])
+    text = 'salt & pepper. ' + MARKDOWN
+
+    # when
+    result = segments.find_branchpoints_in_chunks([text[:40], text[40:]])
+
+    # then
+    assert result == get_all_branchpoints(text)
+    assert [(5, 6, 'and')] not in result
+
+
+@pytest.mark.parametrize('strategy', ['greedy', 'optimal'])
+def test_branchpoints_in_parallel_match_whole_text(strategy):
+    # given
+    text = MARKDOWN * 3
+
+    # when
+    result = segments.find_branchpoints_in_parallel(text, processes=2,
+                                                    strategy=strategy,
+                                                    shard_size=40)
+
+    # then
+    assert result == get_all_branchpoints(text, strategy)
+
+
+def test_branchpoints_in_parallel_after_unclosed_fence():
+    # given
+    text = 'Some ```code ' + MARKDOWN * 3
+
+    # when
+    result = segments.find_branchpoints_in_parallel(text, processes=2,
+                                                    shard_size=40)
+
+    # then
+    assert result == get_all_branchpoints(text)
+
+
+@pytest.mark.parametrize('text, index', [
+    ('no open areas', 13),
+    ('some ```code', 5),
+    ('ends with ``', 10),
+    ('see http://x.com', 4),
+    ('almost a url htt', 13),
+    ('a [link](to', 2),
+    ('an ![image', 3),
+    ('a [finished](link) and', 22),
+])
+def test_unresolved_index(text, index):
+    # when
+    result = segments.unresolved_index(text)
+
+    # then
+    assert result == index
+
+
+def test_safe_cut_is_not_inside_unchangeable_area():
+    # given
+    window = 'Before [a link](http://x.com) after.' + ' ' * 20
+
+    # when
+    cut, areas = segments.safe_cut(window)
+
+    # then
+    assert cut == len(window) - segments.MARGIN
+    assert areas == [(16, 29), (7, 29)]
+
+
+@pytest.mark.parametrize('opening', ['Some ```code ', 'A [bracket '])
+def test_window_after_unclosed_area_is_not_rescanned(opening, monkeypatch):
+    # given
+    text = opening + 'It is not 7, I can\'t say.\n' * 200
+    chunks = [text[i:i + 10] for i in range(0, len(text), 10)]
+    calls = []
+    safe_cut = segments.safe_cut
+    monkeypatch.setattr(segments, 'safe_cut',
+                        lambda window: calls.append(window) or
+                        safe_cut(window))
+
+    # when
+    result = segments.find_branchpoints_in_chunks(chunks)
+
+    # then
+    assert result == get_all_branchpoints(text)
+    assert len(calls) < 20
@@ -1,5 +1,6 @@
 import pytest
 from ..src import steganos_decode
+from ..src.benchmark import synthetic_text
 
 def test_change_was_made():
     # given
@@ -192,3 +193,63 @@ def test_get_indices_multiple_changes_with_one_unmade():
     # then
     assert result == (1, 6)
 
+
+@pytest.mark.parametrize('encoded_text', [
+    'The dogs cannot bark.\u200b',
+    'The dogs can bark.',
+    'The dog cannot bark.\u200b',
+    'The dog can bark.',
+])
+def test_string_cursor_decodes_like_text_cursor(encoded_text):
+    # given
+    original_text = 'The dog can bark.'
+    changes = [((4, 7, 'dogs'), 0), ((8, 11, 'cannot'), 1),
+               ((17, 17, '\u200b'), 0)]
+    chunks = [encoded_text[i:i + 3] for i in range(0, len(encoded_text), 3)]
+
+    # when
+    result = list(steganos_decode.decode_changes(
+        changes, steganos_decode.StringCursor(encoded_text),
+        steganos_decode.StringCursor(original_text), 2))
+
+    # then
+    assert result == list(steganos_decode.decode_changes(
+        changes, steganos_decode.TextCursor(chunks),
+        steganos_decode.TextCursor([original_text]), 2))
+
+def test_decode_partial_text_rejects_other_text():
+    # given
+    text = 'The dog can bark. The cat cannot.'
+    branchpoints = [[(4, 7, 'dogs')], [(26, 32, "can't")]]
+
+    # then
+    with pytest.raises(ValueError):
+        steganos_decode.decode_full_text('The dog can bark. A cat cannot.',
+                                         text, 2, branchpoints)
+
+def test_get_indices_places_short_piece_at_earliest_fit():
+    # given
+    text = '23Aa"cannotwill not23cannotwon\'t23\u01c57\t7isn\'twon\'t'
+    branchpoints = steganos_decode.get_all_branchpoints(text)
+    piece = "n'twon't"
+
+    # when
+    result = steganos_decode.get_indices(piece, text, branchpoints)
+
+    # then
+    assert result == (23, 32)
+
+def test_get_indices_does_not_try_every_index_for_long_piece(monkeypatch):
+    # given
+    text = synthetic_text('prose', 5000, seed=2)
+    branchpoints = steganos_decode.get_all_branchpoints(text)
+    piece = text[3000:3050] + 'x' + text[3050:3100]
+    calls = []
+    match_at = steganos_decode.match_at
+    monkeypatch.setattr(steganos_decode, 'match_at',
+                        lambda *args: calls.append(args) or match_at(*args))
+
+    # then
+    with pytest.raises(ValueError):
+        steganos_decode.get_indices(piece, text, branchpoints)
+    assert len(calls) < 100
@@ -61,6 +61,17 @@ def test_make_changes_when_change_is_different_length():
     # then
     assert result == 'It is just a sample text.'
 
+def test_make_changes_with_insertions_at_same_index():
+    # given
+    text = 'Sam. He'
+    changes = [(3, 4, '!'), (3, 3, '\u200f\u200e'), (1, 1, '\u2060')]
+
+    # when
+    result = steganos_encode.make_changes(text, changes)
+
+    # then
+    assert result == 'S\u2060am\u200f\u200e! He'
+
 def test_execute_branchpoints_when_one_is_sandwiched():
     # given
     text = '"How is she?" he asked.'
@@ -75,3 +86,82 @@ def test_execute_branchpoints_when_one_is_sandwiched():
     # then
     assert result == "'How is he?' he asked."
 
+def test_encode_many_matches_encode():
+    # given
+    text = '"I am 9\t," he said. "I can\'t stay."'
+    messages = ['1', '01', '110', '0000']
+
+    # when
+    result = list(steganos_encode.encode_many(messages, text))
+
+    # then
+    assert result == [steganos_encode.encode(bits, text) for bits in messages]
+
+def test_encode_many_with_process_pool():
+    # given
+    text = '"I am 9\t," he said. "I can\'t stay."'
+    messages = ['1', '01', '110', '0000']
+
+    # when
+    result = list(steganos_encode.encode_many(messages, text, processes=2))
+
+    # then
+    assert result == [steganos_encode.encode(bits, text) for bits in messages]
+
+def test_encode_many_with_process_pool_reads_messages_lazily(monkeypatch):
+    # given
+    monkeypatch.setattr(steganos_encode, 'BATCH_SIZE', 2)
+    text = '"I am 9\t," he said. "I can\'t stay."'
+    read = []
+
+    def messages():
+        for index in range(1000):
+            read.append(index)
+            yield '{:04b}'.format(index % 16)
+
+    # when
+    encoded_texts = steganos_encode.encode_many(messages(), text,
+                                                processes=2)
+    first = next(encoded_texts)
+
+    # then
+    assert first == steganos_encode.encode('0000', text)
+    assert len(read) <= 10
+    encoded_texts.close()
+
+def test_encode_many_raises_when_message_is_too_long():
+    # given
+    text = '"I am 9," he said.'
+    messages = ['1', '1' * 100]
+
+    # then
+    with pytest.raises(ValueError):
+        steganos_encode.encode_many(messages, text)
+
+def test_encode_many_raises_when_message_of_iterator_is_reached():
+    # given
+    text = '"I am 9," he said.'
+    messages = iter(['1', '1' * 100])
+
+    # when
+    encoded_texts = steganos_encode.encode_many(messages, text)
+
+    # then
+    next(encoded_texts)
+    with pytest.raises(ValueError):
+        next(encoded_texts)
+
+def test_encode_many_analyzes_text_right_away(monkeypatch):
+    # given
+    analyzed = []
+    get_all_branchpoints = steganos_encode.get_all_branchpoints
+    monkeypatch.setattr(steganos_encode, 'get_all_branchpoints',
+                        lambda text: analyzed.append(text) or
+                        get_all_branchpoints(text))
+
+    # when
+    steganos_encode.encode_many(iter([]), '"I am 9," he said.')
+
+    # then
+    assert analyzed == ['"I am 9," he said.']
+
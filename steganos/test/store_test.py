@@ -0,0 +1,79 @@
+import pytest
+from ..src.branchpoints import OPTIMAL
+from ..src.plan import prepare
+from ..src.store import FORMAT_VERSION, PREAMBLE, load_plan, save_plan
+
+TEXT = ('"I am 9\t," he said. "I can\'t stay." Mary left London.\n'
+        'See [the docs](https://example.com/docs) for more. '
+        '\u00c9t\u00e9 est l\u00e0.')
+
+
+def test_loaded_plan_matches_saved_plan(tmp_path):
+    # given
+    plan = prepare(TEXT, strategy=OPTIMAL)
+    path = str(tmp_path / 'text.stg')
+
+    # when
+    save_plan(plan, path)
+    loaded = load_plan(path)
+
+    # then
+    assert loaded.text == TEXT
+    assert loaded.branchpoints == plan.branchpoints
+    assert list(loaded.change_index.changes) == plan.change_index.changes
+    assert list(loaded.change_index.indices) == plan.change_index.indices
+    assert loaded.strategy == OPTIMAL
+    assert loaded.ruleset == plan.ruleset
+
+
+def test_round_trip_with_loaded_plan(tmp_path):
+    # given
+    plan = prepare(TEXT)
+    path = str(tmp_path / 'text.stg')
+    save_plan(plan, path)
+    encoded_text = plan.encode('1011')
+
+    # when
+    loaded = load_plan(path, TEXT)
+    full = loaded.decode_full_text(encoded_text, message_bits=4)
+    partial = loaded.decode_partial_text(encoded_text[20:], message_bits=4)
+
+    # then
+    assert loaded.encode('1011') == encoded_text
+    assert full == '1011'
+    assert partial == plan.decode_partial_text(encoded_text[20:],
+                                               message_bits=4)
+
+
+def test_load_plan_with_other_text(tmp_path):
+    # given
+    path = str(tmp_path / 'text.stg')
+    save_plan(prepare(TEXT), path)
+
+    # then
+    with pytest.raises(ValueError):
+        load_plan(path, TEXT + ' ')
+
+
+def test_load_plan_with_other_version(tmp_path):
+    # given
+    path = tmp_path / 'text.stg'
+    save_plan(prepare(TEXT), str(path))
+    contents = path.read_bytes()
+    magic, _, header_length = PREAMBLE.unpack_from(contents)
+    path.write_bytes(PREAMBLE.pack(magic, FORMAT_VERSION + 1, header_length) +
+                     contents[PREAMBLE.size:])
+
+    # then
+    with pytest.raises(ValueError):
+        load_plan(str(path))
+
+
+def test_load_plan_of_other_file(tmp_path):
+    # given
+    path = tmp_path / 'text.txt'
+    path.write_bytes(TEXT.encode('utf8'))
+
+    # then
+    with pytest.raises(ValueError):
+        load_plan(str(path))
@@ -0,0 +1,88 @@
+import io
+import pytest
+from ..src import steganos_decode
+from ..src import steganos_encode
+from ..src import stream
+
+TEXT = ('"I am 9\t," he said. "I can\'t stay, I won\'t stay."\n'
+        'See [the docs](http://x.com/9) or ```"code" 9```.  It is not 8.')
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 10, 1000])
+def test_encode_stream_matches_encode(chunk_size):
+    # given
+    destination = io.StringIO()
+
+    # when
+    stream.encode_stream('101', io.StringIO(TEXT), destination, chunk_size)
+
+    # then
+    assert destination.getvalue() == steganos_encode.encode('101', TEXT)
+
+
+def test_encode_stream_inserts_at_end_of_text():
+    # given
+    destination = io.StringIO()
+
+    # when
+    stream.encode_stream('1', io.StringIO('He said A'), destination, 4)
+
+    # then
+    assert destination.getvalue() == steganos_encode.encode('1', 'He said A')
+
+
+def test_encode_stream_from_iterator_of_chunks():
+    # given
+    chunks = (TEXT[i:i + 4] for i in range(0, len(TEXT), 4))
+    destination = io.StringIO()
+
+    # when
+    capacity = stream.encode_stream('10', chunks, destination)
+
+    # then
+    assert capacity == steganos_encode.bit_capacity(TEXT)
+    assert steganos_decode.decode_full_text(destination.getvalue(), TEXT,
+                                            message_bits=2) == '10'
+
+
+def test_encode_stream_raises_when_message_is_too_long():
+    with pytest.raises(ValueError):
+        stream.encode_stream('1' * 1000, [TEXT], io.StringIO())
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 10, 1000])
+def test_decode_stream_matches_decode_full_text(chunk_size):
+    # given
+    encoded_text = steganos_encode.encode('1101', TEXT)
+    expected = steganos_decode.decode_full_text(encoded_text, TEXT)
+
+    # when
+    bits = ['?'] * len(expected)
+    for index, bit in stream.decode_stream(io.StringIO(encoded_text),
+                                           io.StringIO(TEXT),
+                                           chunk_size=chunk_size):
+        bits[index] = bit
+
+    # then
+    assert ''.join(bits) == expected
+
+
+def test_decode_stream_yields_each_bit_once():
+    # given
+    encoded_text = steganos_encode.encode('10', TEXT)
+
+    # when
+    result = list(stream.decode_stream([encoded_text], [TEXT], 2))
+
+    # then
+    assert sorted(result) == [(0, '1'), (1, '0')]
+
+
+def test_decode_stream_raises_on_bad_origin():
+    # given
+    original_text = 'This is a bad sentence with a 9.'
+    encoded_text = 'This does not match with a 9.'
+
+    # then
+    with pytest.raises(ValueError):
+        list(stream.decode_stream([encoded_text], [original_text]))
@@ -0,0 +1,48 @@
+import re
+
+import pytest
+
+from ..src.trie import Trie
+
+
+def finditer_branchpoints(replacements, text):
+    return [[(match.start(), match.end(), replacement)]
+            for phrase, replacement in replacements
+            for match in re.finditer(re.escape(phrase), text)]
+
+
+@pytest.mark.parametrize('replacements, text', [
+    ([("can't", 'cannot'), ('cannot', "can't")], "I can't, I cannot"),
+    ([('is', 'was'), ('is not', "isn't")], 'this is not it'),
+    ([('aa', 'b'), ('a', 'c')], 'aaaaa'),
+    ([('big', 'large'), ('large', 'huge'), ('big', 'great')], 'big large'),
+    ([('x', 'y')], ''),
+])
+def test_trie_matches_each_phrase_like_finditer(replacements, text):
+    # when
+    result = Trie(replacements).find(text)
+
+    # then
+    assert result == finditer_branchpoints(replacements, text)
+
+
+def test_trie_pattern_finds_every_start():
+    # given
+    trie = Trie([('is', 'was'), ('is not', "isn't"), ('it', 'that')])
+    text = 'this is not it'
+
+    # when
+    starts = [match.start() for match in trie.starts_re.finditer(text)]
+
+    # then
+    assert starts == [2, 5, 12]
+    assert trie.find(text, starts) == trie.find(text)
+
+
+def test_trie_without_phrases():
+    assert Trie([]).find('anything') == []
+
+
+def test_trie_with_empty_phrase():
+    with pytest.raises(ValueError):
+        Trie([('', 'x')])
@@ -0,0 +1,60 @@
+import pytest
+from ..src import branchpoints
+from ..src import vectorized
+
+numpy = pytest.importorskip('numpy')
+
+TEXT = ('\t\u00c9t\u00e9. \u00dcn\u00efcode \u03a9mega\u00a0and '
+        '\U0001d400 \U0001d41a\n'
+        'I can\'t say "9" or 1.5.\u2003The End.')
+
+
+def test_character_rule_indices_match_python_rules():
+    # when
+    periods, capitals, word_ends = vectorized.character_rule_indices(TEXT)
+
+    # then
+    assert ([[(i, i, '\u200f\u200e')] for i in periods.tolist()] ==
+            branchpoints.get_directional_mark_branchpoints(TEXT))
+    assert ([[(i + 1, i + 1, '\u2060')] for i in capitals.tolist()] ==
+            branchpoints.get_non_breaking_branchpoints(TEXT))
+    assert ([[(i + 1, i + 1, '\u200b')] for i in word_ends.tolist()] ==
+            branchpoints.get_zero_width_space_branchpoints(TEXT))
+
+
+def test_scan_branchpoints_is_the_same_without_numpy(monkeypatch):
+    # given
+    with_numpy = branchpoints.scan_branchpoints(TEXT)
+    monkeypatch.setattr(vectorized, 'numpy', None)
+
+    # when
+    result = branchpoints.scan_branchpoints(TEXT)
+
+    # then
+    assert result == with_numpy
+
+
+def test_character_rule_indices_of_empty_text():
+    # when
+    result = vectorized.character_rule_indices('')
+
+    # then
+    assert [indices.tolist() for indices in result] == [[], [], []]
+
+
+def test_scan_only_converts_the_indices_of_its_rules(monkeypatch):
+    # given
+    analyzer = branchpoints.Analyzer(rules=['directional_mark', 'tab'])
+    converted = []
+    to_list = vectorized.to_list
+    monkeypatch.setattr(vectorized, 'to_list',
+                        lambda indices: converted.append(indices) or
+                        to_list(indices))
+
+    # when
+    result = analyzer.scan(TEXT)
+
+    # then
+    assert len(converted) == 1
+    assert result['directional_mark'] == (
+        branchpoints.get_directional_mark_branchpoints(TEXT))
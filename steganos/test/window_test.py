@@ -0,0 +1,57 @@
+import random
+
+import pytest
+from ..src.benchmark import synthetic_text
+from ..src.branchpoints import ChangeIndex, get_all_branchpoints
+from ..src.steganos_decode import (decode_partial_text, get_indices,
+                                   get_relevant_changes)
+from ..src.steganos_encode import encode
+from ..src.window import WindowIndex, load_window_index, save_window_index
+
+MARKDOWN = synthetic_text('markdown', 5000, seed=1)
+
+
+@pytest.mark.parametrize('segment_size', [50, 500, 4096])
+def test_relevant_changes_match_whole_text(segment_size):
+    # given
+    index = WindowIndex.build(MARKDOWN, segment_size=segment_size)
+    change_index = ChangeIndex(get_all_branchpoints(MARKDOWN))
+    rng = random.Random(segment_size)
+
+    # then
+    assert index.capacity == change_index.capacity
+    for _ in range(50):
+        start = rng.randrange(len(MARKDOWN))
+        end = min(start + rng.randrange(1, 1000), len(MARKDOWN))
+        assert (index.relevant_changes(MARKDOWN, start, end) ==
+                get_relevant_changes(change_index, start, end))
+
+
+def test_decode_piece_with_window_index(tmp_path):
+    # given
+    bits = '1011001110'
+    encoded_text = encode(bits, MARKDOWN)
+    piece = encoded_text[2000:3000]
+    encoded_range = get_indices(piece, MARKDOWN,
+                                get_all_branchpoints(MARKDOWN))
+    path = str(tmp_path / 'text.win')
+    save_window_index(WindowIndex.build(MARKDOWN, segment_size=500), path)
+
+    # when
+    result = decode_partial_text(piece, MARKDOWN, encoded_range,
+                                 message_bits=10,
+                                 window_index=load_window_index(path))
+
+    # then
+    assert result == decode_partial_text(piece, MARKDOWN, encoded_range,
+                                         message_bits=10)
+    assert result.count('?') < 10
+
+
+def test_window_index_of_another_text():
+    # given
+    index = WindowIndex.build(MARKDOWN)
+
+    # then
+    with pytest.raises(ValueError):
+        index.relevant_changes(MARKDOWN[:-1], 0, 100)